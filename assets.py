@@ -0,0 +1,153 @@
+"""Sprite atlas.
+
+Decoding and scaling every PNG at startup is slow on SD-card cabinets, so
+``python assets.py`` packs all player and ghost sprites, pre-scaled to each
+size in ``SPRITE_SIZES``, into one file:
+
+    magic "PKAT", version, index length, sheet width, sheet height
+    index (JSON): source file sizes and mtimes, sprite rects by name and size
+    sheet pixels, raw RGBA
+
+``load_sprites`` reads that file with a single read and cuts the sprites out
+of the sheet. If the atlas is missing, lacks the size or a source PNG changed
+since it was built, the sprites come from the PNGs instead and the atlas is
+rewritten for the next start.
+"""
+
+import json
+import os
+import struct
+
+import pygame
+
+
+ATLAS_FILE = "sprites.atlas"
+MAGIC = b"PKAT"
+VERSION = 1
+HEADER = struct.Struct("<4sHIHH")
+SPRITE_SIZES = ((45, 45),)
+
+# Sprite name -> candidate source paths, first existing one wins
+SPRITE_SOURCES = {
+    **{
+        f"player{index}": [f"Packman Images/{index} packman.png", f"Packman Images/Player images/{index} packman.png"]
+        for index in range(1, 5)
+    },
+    "blinky": ["red ghost.png", "Packman Images/ghost images/red ghost.png"],
+    "pinky": ["pink ghost.png", "Packman Images/ghost images/pink ghost.png"],
+    "inky": ["blue ghost.png", "Packman Images/ghost images/blue ghost.png"],
+    "clyde": ["orange ghost.png", "Packman Images/ghost images/orange ghost.png"],
+    "spooked": ["powerup ghost.png", "Packman Images/ghost images/powerup ghost.png"],
+    "dead": ["dead ghost.png", "Packman Images/ghost images/dead ghost.png"],
+}
+
+
+def resolve_existing_path(candidates):
+    for candidate in candidates:
+        if os.path.exists(candidate):
+            return candidate
+    raise FileNotFoundError(f"None of these asset paths exist: {candidates}")
+
+
+def load_scaled_image(candidates, size):
+    if isinstance(candidates, str):
+        candidates = [candidates]
+    path = resolve_existing_path(candidates)
+    return pygame.transform.scale(pygame.image.load(path).convert_alpha(), size)
+
+
+def sprite_key(name, size):
+    return f"{name}@{size[0]}x{size[1]}"
+
+
+def source_stamp(path):
+    info = os.stat(path)
+    return [info.st_size, info.st_mtime_ns]
+
+
+def load_source_sprites(sizes):
+    # {(name, size): surface} straight from the PNGs, plus their paths
+    sprites = {}
+    sources = {}
+    for name, candidates in SPRITE_SOURCES.items():
+        path = resolve_existing_path(candidates)
+        sources[name] = path
+        image = pygame.image.load(path).convert_alpha()
+        for size in sizes:
+            sprites[(name, size)] = pygame.transform.scale(image, size)
+    return sprites, sources
+
+
+def build_atlas(sprites, sources, path=ATLAS_FILE):
+    # Sprites go in one row per size, left to right
+    sizes = sorted({size for _, size in sprites})
+    width = max(size[0] * len(SPRITE_SOURCES) for size in sizes)
+    height = sum(size[1] for size in sizes)
+    sheet = pygame.Surface((width, height), pygame.SRCALPHA)
+    rects = {}
+    y_pos = 0
+    for size in sizes:
+        for column, name in enumerate(SPRITE_SOURCES):
+            rect = (column * size[0], y_pos, size[0], size[1])
+            sheet.blit(sprites[(name, size)], rect[:2])
+            rects[sprite_key(name, size)] = rect
+        y_pos += size[1]
+    index = json.dumps(
+        {"sources": {path: source_stamp(path) for path in sources.values()}, "sprites": rects},
+        sort_keys=True,
+    ).encode("utf-8")
+    data = HEADER.pack(MAGIC, VERSION, len(index), width, height) + index + pygame.image.tobytes(sheet, "RGBA")
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as atlas_file:
+            atlas_file.write(data)
+        os.replace(temporary, path)
+    except OSError:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def read_atlas(size, path=ATLAS_FILE):
+    # {name: surface} from the atlas, or None if it is missing or stale
+    try:
+        with open(path, "rb") as atlas_file:
+            data = atlas_file.read()
+    except OSError:
+        return None
+    if len(data) < HEADER.size:
+        return None
+    magic, version, index_length, width, height = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION or len(data) != HEADER.size + index_length + width * height * 4:
+        return None
+    index = json.loads(data[HEADER.size:HEADER.size + index_length])
+    try:
+        if any(source_stamp(source) != stamp for source, stamp in index["sources"].items()):
+            return None
+    except OSError:
+        return None
+    keys = {name: sprite_key(name, size) for name in SPRITE_SOURCES}
+    if any(key not in index["sprites"] for key in keys.values()):
+        return None
+    pixels = data[HEADER.size + index_length:]
+    sheet = pygame.image.frombuffer(pixels, (width, height), "RGBA").convert_alpha()
+    return {name: sheet.subsurface(index["sprites"][key]) for name, key in keys.items()}
+
+
+def load_sprites(size, path=ATLAS_FILE):
+    # {name: surface} at size; needs a display for convert_alpha
+    sprites = read_atlas(size, path)
+    if sprites is None:
+        sizes = sorted(set(SPRITE_SIZES) | {size})
+        scaled, sources = load_source_sprites(sizes)
+        build_atlas(scaled, sources, path)
+        sprites = {name: scaled[(name, size)] for name in SPRITE_SOURCES}
+    return sprites
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    pygame.display.init()
+    pygame.display.set_mode((1, 1))
+    build_atlas(*load_source_sprites(SPRITE_SIZES))
+    print(f"{ATLAS_FILE}: {len(SPRITE_SOURCES)} sprites x {len(SPRITE_SIZES)} sizes")
@@ -0,0 +1,290 @@
+"""Lockstep NumPy port of ``engine.Game`` for stepping many games at once.
+
+Every game lives in struct-of-arrays buffers (one row per game, one column per
+ghost), so ``BatchGame.step(actions)`` advances all boards with a fixed number
+of array operations instead of one interpreted ``Ghost`` per ghost per game.
+The ghost steering branches are not re-implemented by hand: they are compiled
+into lookup tables by running the engine's own ``Ghost.move_*`` methods over
+every combination of inputs they can see, so both simulators share one set of
+rules.
+"""
+
+import numpy as np
+
+import engine
+import levels
+import walk_tables
+from board import boards
+
+
+STATUS_PLAYING = 0
+STATUS_GAME_OVER = 1
+STATUS_WIN = 2
+
+BLINKY, INKY, PINKY, CLYDE = range(4)
+GHOST_STARTS = (engine.BLINKY_START, engine.INKY_START, engine.PINKY_START, engine.CLYDE_START)
+
+TILE_HEIGHT = engine.TILE_HEIGHT
+TILE_WIDTH = engine.TILE_WIDTH
+
+_BOARD = np.array(boards, dtype=np.int8)
+_ROWS, _COLS = _BOARD.shape
+# Ghost house of the board.py boards, and the points engine.house_points derives from it
+_HOUSE_X, _HOUSE_Y, _HOUSE_WIDTH, _HOUSE_HEIGHT = levels.GHOST_HOUSE
+_BOX_BOUNDS, _RETURN_TARGET, _EXIT_TARGET = engine.house_points(levels.GHOST_HOUSE)
+
+
+def _build_policy_tables():
+    # Output of each move_* method for every (direction, target-x side,
+    # target-y side, turn mask). The y side distinguishes targets closer than
+    # one step because move_clyde/move_inky re-read y_pos after moving.
+    methods = [
+        engine.Ghost.move_blinky,
+        engine.Ghost.move_inky,
+        engine.Ghost.move_pinky,
+        engine.Ghost.move_clyde,
+    ]
+    # Each entry packs the new direction (bits 0-1) and the x/y step in
+    # units of speed, offset by one (bits 2-3 and 4-5).
+    x_offsets = (-5, 0, 5)
+    y_offsets = (-5, 0, 1, 5)
+    table = np.zeros((4, 4, len(x_offsets), len(y_offsets), 16), dtype=np.int8)
+    ghost = engine.Ghost.__new__(engine.Ghost)
+    for policy, method in enumerate(methods):
+        for direction in range(4):
+            for x_side, x_offset in enumerate(x_offsets):
+                for y_side, y_offset in enumerate(y_offsets):
+                    for mask in range(16):
+                        ghost.x_pos = 100
+                        ghost.y_pos = 100
+                        ghost.speed = 2
+                        ghost.direction = direction
+                        ghost.target = (100 + x_offset, 100 + y_offset)
+                        ghost.turns = [bool(mask & (1 << bit)) for bit in range(4)]
+                        method(ghost)
+                        step_x = (ghost.x_pos - 100) // 2 + 1
+                        step_y = (ghost.y_pos - 100) // 2 + 1
+                        table[policy, direction, x_side, y_side, mask] = ghost.direction | (step_x << 2) | (step_y << 4)
+    return table.ravel()
+
+
+_POLICY_TABLE = _build_policy_tables()
+
+
+def _turn_masks(turn_sets):
+    return np.array([sum(1 << bit for bit in range(4) if turns[bit]) for turns in turn_sets], dtype=np.int8)
+
+
+# Turn permissions come from the engine's walk tables, filled up front and
+# converted to bit masks (bit 0 right, 1 left, 2 up, 3 down).
+_WALK = walk_tables.compile_walk_tables(boards).fill()
+_X_OFFSETS = np.array(_WALK.x_offsets, dtype=np.int32)
+_Y_OFFSETS = np.array(_WALK.y_offsets, dtype=np.int32)
+_PLAYER_MASKS = _turn_masks(_WALK.player)
+_GHOST_MASKS = np.stack([_turn_masks(_WALK.ghost), _turn_masks(_WALK.ghost_gate)], axis=1).ravel()
+
+
+def _walk_index(center_x, center_y, direction):
+    x_offset = _X_OFFSETS.take(center_x - walk_tables.MIN_CENTER_X, mode="clip")
+    y_offset = _Y_OFFSETS.take(center_y, mode="clip")
+    return y_offset + x_offset + direction
+
+
+def _in_box(x_pos, y_pos):
+    left, top, right, bottom = _BOX_BOUNDS
+    return (x_pos > left) & (x_pos < right) & (y_pos > top) & (y_pos < bottom)
+
+
+class BatchGame:
+    def __init__(self, count):
+        self.count = count
+        self.pellets = np.zeros((count, _ROWS, _COLS), dtype=np.int8)
+        self.pellets_left = np.zeros(count, dtype=np.int32)
+        self.score = np.zeros(count, dtype=np.int64)
+        self.lives = np.zeros(count, dtype=np.int32)
+        self.status = np.zeros(count, dtype=np.int8)
+        self.score_pop_timer = np.zeros(count, dtype=np.int32)
+        self.player_x = np.zeros(count, dtype=np.int32)
+        self.player_y = np.zeros(count, dtype=np.int32)
+        self.direction = np.zeros(count, dtype=np.int8)
+        self.direction_command = np.zeros(count, dtype=np.int8)
+        self.startup_counter = np.zeros(count, dtype=np.int32)
+        self.powerup = np.zeros(count, dtype=bool)
+        self.power_counter = np.zeros(count, dtype=np.int32)
+        self.ghost_x = np.zeros((count, 4), dtype=np.int32)
+        self.ghost_y = np.zeros((count, 4), dtype=np.int32)
+        self.ghost_direction = np.zeros((count, 4), dtype=np.int8)
+        self.ghost_dead = np.zeros((count, 4), dtype=bool)
+        self.eaten_ghost = np.zeros((count, 4), dtype=bool)
+        # Ghosts steer toward the targets picked on the previous tick, like
+        # the Ghost objects built before get_targets() in engine.Game.step.
+        self.target_x = np.full((count, 4), engine.PLAYER_START[0], dtype=np.int32)
+        self.target_y = np.full((count, 4), engine.PLAYER_START[1], dtype=np.int32)
+        self.reset()
+
+    def reset(self, mask=None):
+        if mask is None:
+            mask = np.ones(self.count, dtype=bool)
+        start = np.where(_BOARD < 3, _BOARD, 0)
+        self.pellets[mask] = start
+        self.pellets_left[mask] = np.count_nonzero(start)
+        self.score[mask] = 0
+        self.lives[mask] = engine.DEFAULT_LIVES
+        self.status[mask] = STATUS_PLAYING
+        self.score_pop_timer[mask] = 0
+        self.reset_round(mask)
+
+    def reset_round(self, mask):
+        self.player_x[mask] = engine.PLAYER_START[0]
+        self.player_y[mask] = engine.PLAYER_START[1]
+        self.direction[mask] = 0
+        self.direction_command[mask] = 0
+        for ghost, (x_pos, y_pos, direction) in enumerate(GHOST_STARTS):
+            self.ghost_x[mask, ghost] = x_pos
+            self.ghost_y[mask, ghost] = y_pos
+            self.ghost_direction[mask, ghost] = direction
+        self.startup_counter[mask] = 0
+        self.powerup[mask] = False
+        self.power_counter[mask] = 0
+        self.eaten_ghost[mask] = False
+        self.ghost_dead[mask] = False
+
+    def step(self, actions=None):
+        active = self.status == STATUS_PLAYING
+        if actions is not None:
+            self.direction_command = np.where(active, actions, self.direction_command).astype(np.int8)
+
+        powered = active & self.powerup
+        expired = powered & (self.power_counter >= engine.POWERUP_FRAMES)
+        self.power_counter += powered & ~expired
+        self.power_counter[expired] = 0
+        self.powerup &= ~expired
+        self.eaten_ghost[expired] = False
+
+        starting = active & (self.startup_counter < engine.STARTUP_FRAMES)
+        moving = active & ~starting
+        self.startup_counter += starting
+
+        # Player turn permissions and the buffered direction change
+        turns = _PLAYER_MASKS.take(_walk_index(self.player_x + 23, self.player_y + 24, self.direction))
+        command = self.direction_command
+        can_turn = active & ((turns >> command) & 1 == 1)
+        self.direction = np.where(can_turn, command, self.direction).astype(np.int8)
+
+        speeds = np.where(self.powerup[:, None], 1, 2)
+        speeds = np.where(self.eaten_ghost, 2, speeds)
+        speeds = np.where(self.ghost_dead, 4, speeds)
+
+        in_box = _in_box(self.ghost_x, self.ghost_y)
+        # As in Ghost.check_collisions, only dead ghosts may pass through the gate.
+        ghost_index = _walk_index(self.ghost_x + 22, self.ghost_y + 22, self.ghost_direction)
+        turn_mask = _GHOST_MASKS.take(ghost_index * 2 + self.ghost_dead)
+        new_target_x, new_target_y = self._targets()
+
+        # Player movement
+        direction = self.direction
+        allowed = (turns >> direction) & 1 == 1
+        step_x = np.where(allowed & (direction == 0), 1, np.where(allowed & (direction == 1), -1, 0))
+        step_y = np.where(allowed & (direction == 2), -1, np.where(allowed & (direction == 3), 1, 0))
+        self.player_x += moving * step_x * engine.PLAYER_SPEED
+        self.player_y += moving * step_y * engine.PLAYER_SPEED
+
+        # Ghost movement: dead or boxed ghosts fall back to clyde's policy
+        policy = np.broadcast_to(np.arange(4, dtype=np.int8), (self.count, 4))
+        policy = np.where(self.ghost_dead | in_box, CLYDE, policy)
+        x_side = np.sign(self.target_x - self.ghost_x) + 1
+        y_delta = self.target_y - self.ghost_y
+        y_side = np.where(y_delta < 0, 0, np.where(y_delta == 0, 1, np.where(y_delta < speeds, 2, 3)))
+        index = (((policy * 4 + self.ghost_direction) * 3 + x_side) * 4 + y_side) * 16 + turn_mask
+        outcome = _POLICY_TABLE.take(index)
+        ghost_moving = moving[:, None]
+        self.ghost_direction = np.where(ghost_moving, outcome & 3, self.ghost_direction).astype(np.int8)
+        self.ghost_x += ghost_moving * ((outcome >> 2 & 3) - 1) * speeds
+        self.ghost_y += ghost_moving * ((outcome >> 4 & 3) - 1) * speeds
+        self.ghost_x = np.where(self.ghost_x < -30, engine.WIDTH, np.where(self.ghost_x > engine.WIDTH, -30, self.ghost_x))
+        self.target_x = np.where(active[:, None], new_target_x, self.target_x)
+        self.target_y = np.where(active[:, None], new_target_y, self.target_y)
+
+        self.player_x = np.where(self.player_x > engine.WIDTH, -47, np.where(self.player_x < -50, 897, self.player_x))
+
+        # Pellets
+        center_x = self.player_x + 23
+        center_y = self.player_y + 24
+        games = np.arange(self.count)
+        rows = (center_y // TILE_HEIGHT) % _ROWS
+        cols = (center_x // TILE_WIDTH) % _COLS
+        can_eat = active & (self.player_x > 0) & (self.player_x < 870)
+        tile = np.where(can_eat, self.pellets[games, rows, cols], 0)
+        eaten = tile > 0
+        self.pellets[games[eaten], rows[eaten], cols[eaten]] = 0
+        self.pellets_left -= eaten
+        self.score += np.where(tile == 1, 10, np.where(tile == 2, 50, 0))
+        power_pellet = tile == 2
+        self.powerup |= power_pellet
+        self.power_counter[power_pellet] = 0
+        self.eaten_ghost[power_pellet] = False
+        self.score_pop_timer[eaten] = 10
+
+        # Ghost contact, using the player_circle/Ghost.rect overlap test
+        ghost_left = self.ghost_x + 4
+        ghost_top = self.ghost_y + 4
+        player_left = (center_x - 20)[:, None]
+        player_top = (center_y - 20)[:, None]
+        touching = (
+            (player_left < ghost_left + 36)
+            & (ghost_left < player_left + 40)
+            & (player_top < ghost_top + 36)
+            & (ghost_top < player_top + 40)
+        )
+        alive = touching & ~self.ghost_dead
+        powerup = self.powerup[:, None]
+        caught = active & np.any(alive & (~powerup | self.eaten_ghost), axis=1)
+        self._lose_life(caught)
+
+        survived = active & ~caught
+        for ghost in range(4):
+            eats = survived & self.powerup & alive[:, ghost] & ~self.eaten_ghost[:, ghost]
+            self.ghost_dead[eats, ghost] = True
+            self.eaten_ghost[eats, ghost] = True
+            self.score[eats] += (2 ** np.count_nonzero(self.eaten_ghost[eats], axis=1)) * 100
+            self.score_pop_timer[eats] = 12
+
+        revived = survived[:, None] & _in_box(self.ghost_x, self.ghost_y) & self.ghost_dead
+        self.ghost_dead &= ~revived
+        self.score_pop_timer -= survived & (self.score_pop_timer > 0)
+        self.status[survived & (self.pellets_left == 0)] = STATUS_WIN
+        return self.status
+
+    def _targets(self):
+        player_x = self.player_x[:, None]
+        player_y = self.player_y[:, None]
+        center_x, center_y = engine.BOARD_CENTER
+        runaway_x = np.where(player_x < center_x, engine.WIDTH, 0)
+        runaway_y = np.where(player_y < center_y, engine.GAME_HEIGHT, 0)
+        ghost_x = self.ghost_x
+        ghost_y = self.ghost_y
+        in_house = (
+            (ghost_x > _HOUSE_X) & (ghost_x < _HOUSE_X + _HOUSE_WIDTH)
+            & (ghost_y > _HOUSE_Y) & (ghost_y < _HOUSE_Y + _HOUSE_HEIGHT)
+        )
+        chase_x = np.where(in_house, _EXIT_TARGET[0], player_x)
+        chase_y = np.where(in_house, _EXIT_TARGET[1], player_y)
+
+        flee_x = np.concatenate([runaway_x, runaway_x, player_x, np.full_like(player_x, center_x)], axis=1)
+        flee_y = np.concatenate([runaway_y, player_y, runaway_y, np.full_like(player_y, center_y)], axis=1)
+        # pinky keeps fleeing while the power pellet lasts, even once eaten
+        fleeing = self.powerup[:, None] & ~self.eaten_ghost
+        fleeing[:, PINKY] = self.powerup
+        target_x = np.where(fleeing, flee_x, chase_x)
+        target_y = np.where(fleeing, flee_y, chase_y)
+        target_x = np.where(self.ghost_dead, _RETURN_TARGET[0], target_x)
+        target_y = np.where(self.ghost_dead, _RETURN_TARGET[1], target_y)
+        return target_x, target_y
+
+    def _lose_life(self, mask):
+        spare = mask & (self.lives > 1)
+        final = mask & ~spare
+        self.lives -= spare
+        self.reset_round(spare)
+        self.lives[final] = 0
+        self.status[final] = STATUS_GAME_OVER
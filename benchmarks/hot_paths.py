@@ -0,0 +1,285 @@
+"""Microbenchmarks of the per-tick and per-frame hot paths.
+
+Each function is timed on its own, on game states taken from a seeded bot
+game with snapshot.py: the start of a level, plain chasing and a running
+power pellet (plus the same for the shortest_path ghost AI, for
+Ghost.move_navigate). Functions that move a ghost or refresh its cached
+turns are reset before every call, and the reset alone is timed and
+subtracted.
+
+    python benchmarks/hot_paths.py
+    python benchmarks/hot_paths.py --save before.json
+    python benchmarks/hot_paths.py --baseline before.json   # exit 1 on a regression
+    python benchmarks/hot_paths.py --filter draw_ --json
+
+Results are nanoseconds per call, the best of --repeats runs. The SDL dummy
+video driver is used unless --display is given.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+POLICY = "greedy"
+MAX_STATE_TICKS = 20000
+MOVES = ("move_blinky", "move_inky", "move_pinky", "move_clyde")
+
+
+def collect_states(ghost_ai, seed):
+    # {name: snapshot bytes} from one bot game
+    import engine
+    import policies
+    import snapshot
+
+    game = engine.Game(ghost_ai=ghost_ai)
+    policy = policies.load_policy(POLICY)(seed)
+    states = {}
+    while game.status == engine.STATUS_PLAYING and game.ticks < MAX_STATE_TICKS and len(states) < 3:
+        if "start" not in states and game.moving:
+            states["start"] = snapshot.take(game)
+        elif "chase" not in states and game.ticks >= 600 and not game.powerup:
+            states["chase"] = snapshot.take(game)
+        elif "powerup" not in states and game.powerup and not any(ghost.dead for ghost in game.ghosts):
+            states["powerup"] = snapshot.take(game)
+        if game.step(policy(game)) == engine.STATUS_WIN and game.has_next_level():
+            game.advance_level()
+    return states
+
+
+def ghost_reset(ghost):
+    # Puts a ghost back where it was and drops its cached turns
+    x_pos, y_pos, direction = ghost.x_pos, ghost.y_pos, ghost.direction
+
+    def reset():
+        ghost.x_pos = x_pos
+        ghost.y_pos = y_pos
+        ghost.direction = direction
+        ghost.center_x = None
+        ghost._turns_key = None
+
+    return reset
+
+
+def ghost_move_reset(ghost):
+    # Moves only change position and direction; the turns stay valid
+    x_pos, y_pos, direction = ghost.x_pos, ghost.y_pos, ghost.direction
+
+    def reset():
+        ghost.x_pos = x_pos
+        ghost.y_pos = y_pos
+        ghost.direction = direction
+
+    return reset
+
+
+def build_cases(seed):
+    # [(name, make)]; make() puts the scene in place and returns (func, reset)
+    import pygame
+    import engine
+    import main
+    import snapshot
+    import ui
+
+    cases = []
+    for ghost_ai in engine.GHOST_AI_MODES:
+        game = engine.Game(ghost_ai=ghost_ai)
+        for state, data in collect_states(ghost_ai, seed).items():
+
+            def load(data=data, game=game):
+                snapshot.restore(game, data)
+                main.game = game
+                return game
+
+            def add(name, make, state=state, load=load):
+                cases.append((f"{name}[{state}]", lambda: make(load())))
+
+            if ghost_ai == engine.GHOST_AI_SHORTEST_PATH:
+                add(
+                    "Ghost.move_navigate",
+                    lambda game: (lambda: game.ghosts[0].move_navigate(game.navigation), ghost_move_reset(game.ghosts[0])),
+                )
+                continue
+            add(
+                "Game.check_position",
+                lambda game: (lambda: game.check_position(game.player_x + 23, game.player_y + 24), None),
+            )
+            add("Ghost.check_collisions", lambda game: (game.ghosts[0].check_collisions, ghost_reset(game.ghosts[0])))
+            for index, move in enumerate(MOVES):
+                add(
+                    f"Ghost.{move}",
+                    lambda game, index=index, move=move: (
+                        getattr(game.ghosts[index], move), ghost_move_reset(game.ghosts[index])
+                    ),
+                )
+            add("Game.get_targets", lambda game: (lambda: game.get_targets(*game.ghosts), None))
+            add("Game.update_ghost_speeds", lambda game: (game.update_ghost_speeds, None))
+            add("Game.remaining_pellets", lambda game: (game.remaining_pellets, None))
+            add("main.draw_board", lambda game: (main.draw_board, None))
+            add("main.draw_player", lambda game: (lambda: main.draw_player((game.player_x, game.player_y)), None))
+
+    def hud(changing):
+        scores = iter(range(10 ** 9))
+
+        def draw():
+            score = next(scores) * 10 if changing else main.game.score
+            ui.draw_hud(main.screen, main.fonts, score, 12340, 3, 1, False, 60.0, 0)
+
+        return draw, None
+
+    cases.append(("ui.draw_hud[steady]", lambda: hud(False)))
+    cases.append(("ui.draw_hud[score changing]", lambda: hud(True)))
+    cases.append((
+        "ui.draw_menu[pause]",
+        lambda: (
+            lambda: ui.draw_menu(
+                main.screen, main.fonts, "Paused", main.PAUSE_SUBTITLE, main.PAUSE_OPTIONS, 1, (0, 0), False
+            ),
+            None,
+        ),
+    ))
+    cases.append((
+        "ui.draw_gradient_background",
+        lambda: (lambda: ui.draw_gradient_background(main.screen, main.WIDTH, main.HEIGHT), None),
+    ))
+    pygame.event.pump()
+    return cases
+
+
+def run_loop(func, reset, number):
+    perf_counter = time.perf_counter
+    started = perf_counter()
+    if reset is None:
+        for _ in range(number):
+            func()
+    else:
+        for _ in range(number):
+            reset()
+            func()
+    return perf_counter() - started
+
+
+def run_resets(reset, number):
+    perf_counter = time.perf_counter
+    started = perf_counter()
+    for _ in range(number):
+        reset()
+    return perf_counter() - started
+
+
+def time_case(func, reset, repeats, min_seconds):
+    # Nanoseconds per call: best and median of repeats runs of a calibrated
+    # loop, less the best time of the resets on their own. The collector is
+    # off while timing, as in timeit.
+    gc.collect()
+    gc.disable()
+    try:
+        return measure(func, reset, repeats, min_seconds)
+    finally:
+        gc.enable()
+
+
+def measure(func, reset, repeats, min_seconds):
+    number = 1
+    while True:
+        if reset is not None:
+            reset()
+        func()
+        if run_loop(func, reset, number) >= min_seconds:
+            break
+        number *= 2
+    per_call = [run_loop(func, reset, number) / number * 1e9 for _ in range(repeats)]
+    if reset is not None:
+        overhead = min(run_resets(reset, number) for _ in range(repeats)) / number * 1e9
+        per_call = [max(0.0, value - overhead) for value in per_call]
+    return {"best": round(min(per_call), 1), "median": round(statistics.median(per_call), 1), "number": number}
+
+
+def compare(results, baseline, threshold):
+    # Prints the change per case; returns the names slower than threshold
+    regressions = []
+    print(f"{'case':<44} {'baseline':>10} {'now':>10} {'change':>8}")
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:<44} {'-':>10} {result['best']:>10.0f} {'new':>8}")
+            continue
+        change = result["best"] / before["best"] - 1 if before["best"] else 0.0
+        marker = ""
+        if change > threshold:
+            regressions.append(name)
+            marker = "  slower"
+        print(f"{name:<44} {before['best']:>10.0f} {result['best']:>10.0f} {change:>+8.1%}{marker}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=5, help="timed runs per case; the best is reported")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds each case is timed for, over all repeats")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the bot game the states come from")
+    parser.add_argument("--filter", help="only cases whose name contains this")
+    parser.add_argument("--save", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against results saved with --save")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown that counts as a regression")
+    parser.add_argument("--display", action="store_true", help="use the real display instead of SDL's dummy driver")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+    # Paths are relative to where the command ran, not to the game folder
+    save_path = os.path.abspath(args.save) if args.save else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    if not args.display:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    import pygame
+    import main as game_window
+
+    game_window.init_display()
+    game_window.load_game_assets()
+
+    results = {}
+    for name, make in build_cases(args.seed):
+        if args.filter and args.filter not in name:
+            continue
+        func, reset = make()
+        results[name] = time_case(func, reset, args.repeats, args.min_time / args.repeats)
+        if not args.json:
+            print(f"  {name:<44} {results[name]['best']:>10.1f} ns", file=sys.stderr)
+    pygame.quit()
+
+    report = {
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "machine": platform.machine(),
+        "seed": args.seed,
+        "unit": "ns per call",
+        "results": results,
+    }
+    if save_path:
+        with open(save_path, "w", encoding="utf-8") as report_file:
+            json.dump(report, report_file, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+
+    if baseline_path:
+        with open(baseline_path, "r", encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} case(s) more than {args.threshold:.0%} slower than {args.baseline}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
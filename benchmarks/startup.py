@@ -0,0 +1,128 @@
+"""Time-to-first-frame breakdown for main.py.
+
+Each run starts a fresh interpreter, so imports, the display and caches on
+disk are as cold as on a real launch, and times the steps main() takes up to
+the first presented frame plus the work deferred until after it:
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 10 --imports 15
+    python benchmarks/startup.py --budget-ms 400   # exit 1 when over budget
+
+The SDL dummy video driver is used unless --display is given.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PHASES = ("interpreter", "import pygame", "import game modules", "init display", "first frame", "game assets")
+
+
+def child():
+    # Runs inside the measured interpreter; prints one JSON object of epoch times
+    marks = {"start": time.time()}
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    import pygame
+
+    marks["import pygame"] = time.time()
+    import main
+
+    marks["import game modules"] = time.time()
+    main.init_display()
+    main.best_score = main.load_high_score()
+    marks["init display"] = time.time()
+    main.run_frame()
+    marks["first frame"] = time.time()
+    main.load_game_assets()
+    marks["game assets"] = time.time()
+    pygame.quit()
+    print(json.dumps(marks))
+
+
+def run_once(environment):
+    launched = time.time()
+    output = subprocess.run(
+        [sys.executable, __file__, "--child"], env=environment, capture_output=True, text=True, check=True
+    ).stdout
+    marks = json.loads(output.strip().splitlines()[-1])
+    times = {"interpreter": marks["start"] - launched}
+    previous = marks["start"]
+    for phase in PHASES[1:]:
+        times[phase] = marks[phase] - previous
+        previous = marks[phase]
+    times["time to first frame"] = marks["first frame"] - launched
+    return {phase: value * 1000 for phase, value in times.items()}
+
+
+def slowest_imports(environment, count):
+    # Cumulative import time of each module main.py imports directly,
+    # from python -X importtime
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        env=environment, cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        fields = line[len("import time:"):].split("|")
+        if not line.startswith("import time:") or len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, name.strip(), int(fields[1]) / 1000))
+    # Children are logged before their parent, so main's direct imports are
+    # the depth-1 entries just above main's own entry
+    imports = []
+    for depth, name, cumulative in reversed(entries[:[entry[1] for entry in entries].index("main")]):
+        if depth == 0:
+            break
+        if depth == 1:
+            imports.append((cumulative, name))
+    main_total = next(cumulative for depth, name, cumulative in entries if name == "main")
+    return [(main_total, "main (total)")] + sorted(imports, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to start; medians are reported")
+    parser.add_argument("--imports", type=int, default=10, help="list this many slowest top-level imports")
+    parser.add_argument("--budget-ms", type=float, help="fail when the median time to first frame exceeds this")
+    parser.add_argument("--display", action="store_true", help="use the real display instead of SDL's dummy driver")
+    parser.add_argument("--json", action="store_true", help="print the medians as JSON")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child()
+        return 0
+
+    environment = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT="1")
+    if not args.display:
+        environment.update(SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy")
+    runs = [run_once(environment) for _ in range(args.runs)]
+    medians = {phase: statistics.median(run[phase] for run in runs) for phase in runs[0]}
+
+    if args.json:
+        print(json.dumps({"runs": args.runs, "median_ms": medians}, indent=2))
+    else:
+        print(f"median of {args.runs} runs")
+        for phase, value in medians.items():
+            print(f"  {phase:<22} {value:8.1f} ms")
+        if args.imports:
+            print("slowest imports (cumulative)")
+            for value, name in slowest_imports(environment, args.imports):
+                print(f"  {name:<22} {value:8.1f} ms")
+
+    if args.budget_ms is not None and medians["time to first frame"] > args.budget_ms:
+        print(f"time to first frame {medians['time to first frame']:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
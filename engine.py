@@ -0,0 +1,1141 @@
+"""Headless PackMan simulation.
+
+The engine owns every piece of gameplay state and advances it one tick at a
+time. It never touches the display, loads images or sleeps, so it can be
+stepped as fast as the CPU allows (bots, regression runs, batch statistics)
+while ``main.py`` only handles input, drawing and screen flow on top of it.
+"""
+
+
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+import levels
+from navigation import NO_DIRECTION, OPPOSITE, UNREACHABLE, compile_navigation
+from pellets import PELLET_CACHE_VERSION, split_level
+from walk_tables import WALK_CACHE_VERSION, compile_walk_tables
+
+
+# Board geometry
+WIDTH = 900
+GAME_HEIGHT = 900
+TILE_WIDTH = levels.TILE_WIDTH
+TILE_HEIGHT = levels.TILE_HEIGHT
+
+# Gameplay settings
+PLAYER_SPEED = 2
+DEFAULT_LIVES = 3
+POWERUP_FRAMES = 600
+GHOST_SPEED = 2
+FRIGHTENED_SPEED = 1
+DEAD_SPEED = 4
+STARTUP_FRAMES = 180
+LEVEL_NUMBER = 1
+
+# Per-level tuning, one row per level; clearing the last level wins the game
+LEVEL_SETTINGS = (
+    # (ghost speed, frightened speed, dead speed, powerup frames)
+    (GHOST_SPEED, FRIGHTENED_SPEED, DEAD_SPEED, POWERUP_FRAMES),
+    (2, 1, 4, 480),
+    (2, 1, 4, 360),
+    (3, 2, 4, 300),
+    (3, 2, 4, 240),
+)
+LEVEL_COUNT = len(LEVEL_SETTINGS)
+
+# Start positions
+PLAYER_START = (450, 663)
+BLINKY_START = (56, 58, 0)
+INKY_START = (440, 388, 2)
+PINKY_START = (440, 438, 2)
+CLYDE_START = (440, 438, 2)
+# Ghost ids index these, eaten_ghost, targets and ghost_speeds
+GHOST_STARTS = (BLINKY_START, INKY_START, PINKY_START, CLYDE_START)
+
+# Ghost house points, as offsets into the level's ghost_house rect (those of
+# the classic board). A ghost is in the box while its top-left is inside the
+# inset rect; dead ghosts head for the return point and ghosts leaving the
+# box aim at the exit, far above the gate.
+HOUSE_INSET = (10, 30, 10, 20)
+HOUSE_RETURN = (40, 60)
+HOUSE_EXIT = (60, -240)
+# Frightened ghosts run for the side of the board away from the player;
+# clyde runs for its middle
+BOARD_CENTER = (WIDTH // 2, GAME_HEIGHT // 2)
+
+
+def house_points(ghost_house):
+    # (in-box bounds as left, top, right, bottom), return point and exit of a
+    # ghost_house rect
+    box_x, box_y, box_width, box_height = ghost_house
+    left, top, right, bottom = HOUSE_INSET
+    bounds = (box_x + left, box_y + top, box_x + box_width - right, box_y + box_height - bottom)
+    return bounds, (box_x + HOUSE_RETURN[0], box_y + HOUSE_RETURN[1]), (box_x + HOUSE_EXIT[0], box_y + HOUSE_EXIT[1])
+
+
+# Step results
+STATUS_PLAYING = "playing"
+STATUS_GAME_OVER = "game_over"
+STATUS_WIN = "win"
+STATUS_CODES = {STATUS_PLAYING: 0, STATUS_GAME_OVER: 1, STATUS_WIN: 2}
+
+# Ghost steering: the original per-ghost rules, or shortest tile paths
+GHOST_AI_CLASSIC = "classic"
+GHOST_AI_SHORTEST_PATH = "shortest_path"
+GHOST_AI_MODES = (GHOST_AI_CLASSIC, GHOST_AI_SHORTEST_PATH)
+
+# Everything Game.state_hash packs besides the pellet layer: 17 game
+# counters and flags, 8 values per ghost, eaten flags, turns, ghost speeds
+# and the 4 target points
+STATE_LAYOUT = struct.Struct(f"<{17 + 4 * 8 + 4 + 4 + 4 + 8}i")
+
+
+class Ghost:
+    # Ghosts live for the whole game and are updated in place each tick.
+    __slots__ = (
+        "id", "x_pos", "y_pos", "center_x", "center_y", "direction", "dead", "in_box",
+        "target", "speed", "turns", "rect", "walk", "house", "_turns_key",
+    )
+
+    def __init__(self, ghost_id, x_coord, y_coord, direct, walk, house):
+        self.id = ghost_id
+        self.target = PLAYER_START
+        self.speed = GHOST_SPEED
+        self.walk = walk
+        # in-box bounds from house_points
+        self.house = house
+        self.rect = pygame.rect.Rect(0, 0, 36, 36)
+        self.reset(x_coord, y_coord, direct)
+
+    def __repr__(self):
+        return f"Ghost(id={self.id}, x={self.x_pos}, y={self.y_pos}, direction={self.direction}, dead={self.dead})"
+
+    def reset(self, x_coord, y_coord, direct):
+        self.x_pos = x_coord
+        self.y_pos = y_coord
+        self.center_x = None
+        self.center_y = None
+        self.direction = direct
+        self.dead = False
+        self.in_box = False
+        self._turns_key = None
+        self.check_collisions()
+
+    def state(self):
+        return (self.x_pos, self.y_pos, self.direction, self.dead, self.target, self.speed)
+
+    def set_state(self, state):
+        self.x_pos, self.y_pos, self.direction, self.dead, self.target, self.speed = state
+        self._turns_key = None
+        self.center_x = None
+        self.check_collisions()
+
+    def check_collisions(self):
+        # Center, rect and in_box follow the position; turns are looked up
+        # again only when position, direction or dead changed.
+        center_x = self.x_pos + 22
+        center_y = self.y_pos + 22
+        if center_x != self.center_x or center_y != self.center_y:
+            self.center_x = center_x
+            self.center_y = center_y
+            self.rect.topleft = (center_x - 18, center_y - 18)
+            left, top, right, bottom = self.house
+            self.in_box = left < self.x_pos < right and top < self.y_pos < bottom
+        key = (center_x, center_y, self.direction, self.dead)
+        if key != self._turns_key:
+            self._turns_key = key
+            # R, L, U, D. Only dead ghosts may pass the gate, as in the
+            # original per-frame rebuild where in_box was always seeded False.
+            self.turns = self.walk.ghost_turns(center_x, center_y, self.direction, self.dead)
+        return self.turns, self.in_box
+
+    def move_clyde(self):
+        # r, l, u, d
+        # clyde is going to turn whenever advantageous for pursuit
+        if self.direction == 0:
+            if self.target[0] > self.x_pos and self.turns[0]:
+                self.x_pos += self.speed
+            elif not self.turns[0]:
+                if self.target[1] > self.y_pos and self.turns[3]:
+                    self.direction = 3
+                    self.y_pos += self.speed
+                elif self.target[1] < self.y_pos and self.turns[2]:
+                    self.direction = 2
+                    self.y_pos -= self.speed
+                elif self.target[0] < self.x_pos and self.turns[1]:
+                    self.direction = 1
+                    self.x_pos -= self.speed
+                elif self.turns[3]:
+                    self.direction = 3
+                    self.y_pos += self.speed
+                elif self.turns[2]:
+                    self.direction = 2
+                    self.y_pos -= self.speed
+                elif self.turns[1]:
+                    self.direction = 1
+                    self.x_pos -= self.speed
+            elif self.turns[0]:
+                if self.target[1] > self.y_pos and self.turns[3]:
+                    self.direction = 3
+                    self.y_pos += self.speed
+                if self.target[1] < self.y_pos and self.turns[2]:
+                    self.direction = 2
+                    self.y_pos -= self.speed
+                else:
+                    self.x_pos += self.speed
+        elif self.direction == 1:
+            if self.target[1] > self.y_pos and self.turns[3]:
+                self.direction = 3
+            elif self.target[0] < self.x_pos and self.turns[1]:
+                self.x_pos -= self.speed
+            elif not self.turns[1]:
+                if self.target[1] > self.y_pos and self.turns[3]:
+                    self.direction = 3
+                    self.y_pos += self.speed
+                elif self.target[1] < self.y_pos and self.turns[2]:
+                    self.direction = 2
+                    self.y_pos -= self.speed
+                elif self.target[0] > self.x_pos and self.turns[0]:
+                    self.direction = 0
+                    self.x_pos += self.speed
+                elif self.turns[3]:
+                    self.direction = 3
+                    self.y_pos += self.speed
+                elif self.turns[2]:
+                    self.direction = 2
+                    self.y_pos -= self.speed
+                elif self.turns[0]:
+                    self.direction = 0
+                    self.x_pos += self.speed
+            elif self.turns[1]:
+                if self.target[1] > self.y_pos and self.turns[3]:
+                    self.direction = 3
+                    self.y_pos += self.speed
+                if self.target[1] < self.y_pos and self.turns[2]:
+                    self.direction = 2
+                    self.y_pos -= self.speed
+                else:
+                    self.x_pos -= self.speed
+        elif self.direction == 2:
+            if self.target[0] < self.x_pos and self.turns[1]:
+                self.direction = 1
+                self.x_pos -= self.speed
+            elif self.target[1] < self.y_pos and self.turns[2]:
+                self.direction = 2
+                self.y_pos -= self.speed
+            elif not self.turns[2]:
+                if self.target[0] > self.x_pos and self.turns[0]:
+                    self.direction = 0
+                    self.x_pos += self.speed
+                elif self.target[0] < self.x_pos and self.turns[1]:
+                    self.direction = 1
+                    self.x_pos -= self.speed
+                elif self.target[1] > self.y_pos and self.turns[3]:
+                    self.direction = 3
+                    self.y_pos += self.speed
+                elif self.turns[1]:
+                    self.direction = 1
+                    self.x_pos -= self.speed
+                elif self.turns[3]:
+                    self.direction = 3
+                    self.y_pos += self.speed
+                elif self.turns[0]:
+                    self.direction = 0
+                    self.x_pos += self.speed
+            elif self.turns[2]:
+                if self.target[0] > self.x_pos and self.turns[0]:
+                    self.direction = 0
+                    self.x_pos += self.speed
+                elif self.target[0] < self.x_pos and self.turns[1]:
+                    self.direction = 1
+                    self.x_pos -= self.speed
+                else:
+                    self.y_pos -= self.speed
+        elif self.direction == 3:
+            if self.target[1] > self.y_pos and self.turns[3]:
+                self.y_pos += self.speed
+            elif not self.turns[3]:
+                if self.target[0] > self.x_pos and self.turns[0]:
+                    self.direction = 0
+                    self.x_pos += self.speed
+                elif self.target[0] < self.x_pos and self.turns[1]:
+                    self.direction = 1
+                    self.x_pos -= self.speed
+                elif self.target[1] < self.y_pos and self.turns[2]:
+                    self.direction = 2
+                    self.y_pos -= self.speed
+                elif self.turns[2]:
+                    self.direction = 2
+                    self.y_pos -= self.speed
+                elif self.turns[1]:
+                    self.direction = 1
+                    self.x_pos -= self.speed
+                elif self.turns[0]:
+                    self.direction = 0
+                    self.x_pos += self.speed
+            elif self.turns[3]:
+                if self.target[0] > self.x_pos and self.turns[0]:
+                    self.direction = 0
+                    self.x_pos += self.speed
+                elif self.target[0] < self.x_pos and self.turns[1]:
+                    self.direction = 1
+                    self.x_pos -= self.speed
+                else:
+                    self.y_pos += self.speed
+        if self.x_pos < -30:
+            self.x_pos = WIDTH
+        elif self.x_pos > WIDTH:
+            self.x_pos = -30
+        return self.x_pos, self.y_pos, self.direction
+
+    def move_navigate(self, navigation):
+        # r, l, u, d
+        # at every open turn takes the way that is shortest through the maze;
+        # like the arcade ghosts it never reverses unless every other way is shut
+        turns = self.turns
+        side = 2 if self.direction < 2 else 0
+        if not turns[self.direction] and turns[side] != turns[side + 1]:
+            # A bend in a corridor, not a node of the maze graph: one way on
+            self.direction = side if turns[side] else side + 1
+        elif turns[side] or turns[side + 1] or not turns[self.direction]:
+            # Every ghost heading for the same tile reads the same flow field
+            field = navigation.flow_field(navigation.tile_at(self.target[0] + 22, self.target[1] + 22))
+            source = navigation.tile_at(self.center_x, self.center_y)
+            if field.distance[source] == UNREACHABLE:
+                # e.g. still behind the closed gate; the classic rules find the way out
+                return self.move_clyde()
+            reverse = OPPOSITE[self.direction]
+            direction = field.next_hop[source]
+            if direction == NO_DIRECTION or direction == reverse or not turns[direction]:
+                direction = None
+                best_length = None
+                for option in range(4):
+                    if option != reverse and turns[option]:
+                        length = field.distance[navigation.neighbor(source, option)]
+                        if best_length is None or length < best_length:
+                            direction = option
+                            best_length = length
+            if direction is None:
+                if not turns[reverse]:
+                    return self.x_pos, self.y_pos, self.direction
+                direction = reverse
+            self.direction = direction
+        if self.direction == 0:
+            self.x_pos += self.speed
+        elif self.direction == 1:
+            self.x_pos -= self.speed
+        elif self.direction == 2:
+            self.y_pos -= self.speed
+        else:
+            self.y_pos += self.speed
+        if self.x_pos < -30:
+            self.x_pos = WIDTH
+        elif self.x_pos > WIDTH:
+            self.x_pos = -30
+        return self.x_pos, self.y_pos, self.direction
+
+    def move_blinky(self):
+        # r, l, u, d
+        # blinky is going to turn whenever colliding with walls, otherwise continue straight
+        if self.direction == 0:
+            if self.target[0] > self.x_pos and self.turns[0]:
+                self.x_pos += self.speed
+            elif not self.turns[0]:
+                if self.target[1] > self.y_pos and self.turns[3]:
+                    self.direction = 3
+                    self.y_pos += self.speed
+                elif self.target[1] < self.y_pos and self.turns[2]:
+                    self.direction = 2
+                    self.y_pos -= self.speed
+                elif self.target[0] < self.x_pos and self.turns[1]:
+                    self.direction = 1
+                    self.x_pos -= self.speed
+                elif self.turns[3]:
+                    self.direction = 3
+                    self.y_pos += self.speed
+                elif self.turns[2]:
+                    self.direction = 2
+                    self.y_pos -= self.speed
+                elif self.turns[1]:
+                    self.direction = 1
+                    self.x_pos -= self.speed
+            elif self.turns[0]:
+                self.x_pos += self.speed
+        elif self.direction == 1:
+            if self.target[0] < self.x_pos and self.turns[1]:
+                self.x_pos -= self.speed
+            elif not self.turns[1]:
+                if self.target[1] > self.y_pos and self.turns[3]:
+                    self.direction = 3
+                    self.y_pos += self.speed
+                elif self.target[1] < self.y_pos and self.turns[2]:
+                    self.direction = 2
+                    self.y_pos -= self.speed
+                elif self.target[0] > self.x_pos and self.turns[0]:
+                    self.direction = 0
+                    self.x_pos += self.speed
+                elif self.turns[3]:
+                    self.direction = 3
+                    self.y_pos += self.speed
+                elif self.turns[2]:
+                    self.direction = 2
+                    self.y_pos -= self.speed
+                elif self.turns[0]:
+                    self.direction = 0
+                    self.x_pos += self.speed
+            elif self.turns[1]:
+                self.x_pos -= self.speed
+        elif self.direction == 2:
+            if self.target[1] < self.y_pos and self.turns[2]:
+                self.direction = 2
+                self.y_pos -= self.speed
+            elif not self.turns[2]:
+                if self.target[0] > self.x_pos and self.turns[0]:
+                    self.direction = 0
+                    self.x_pos += self.speed
+                elif self.target[0] < self.x_pos and self.turns[1]:
+                    self.direction = 1
+                    self.x_pos -= self.speed
+                elif self.target[1] > self.y_pos and self.turns[3]:
+                    self.direction = 3
+                    self.y_pos += self.speed
+                elif self.turns[3]:
+                    self.direction = 3
+                    self.y_pos += self.speed
+                elif self.turns[0]:
+                    self.direction = 0
+                    self.x_pos += self.speed
+                elif self.turns[1]:
+                    self.direction = 1
+                    self.x_pos -= self.speed
+            elif self.turns[2]:
+                self.y_pos -= self.speed
+        elif self.direction == 3:
+            if self.target[1] > self.y_pos and self.turns[3]:
+                self.y_pos += self.speed
+            elif not self.turns[3]:
+                if self.target[0] > self.x_pos and self.turns[0]:
+                    self.direction = 0
+                    self.x_pos += self.speed
+                elif self.target[0] < self.x_pos and self.turns[1]:
+                    self.direction = 1
+                    self.x_pos -= self.speed
+                elif self.target[1] < self.y_pos and self.turns[2]:
+                    self.direction = 2
+                    self.y_pos -= self.speed
+                elif self.turns[2]:
+                    self.direction = 2
+                    self.y_pos -= self.speed
+                elif self.turns[0]:
+                    self.direction = 0
+                    self.x_pos += self.speed
+                elif self.turns[1]:
+                    self.direction = 1
+                    self.x_pos -= self.speed
+            elif self.turns[3]:
+                self.y_pos += self.speed
+        if self.x_pos < -30:
+            self.x_pos = WIDTH
+        elif self.x_pos > WIDTH:
+            self.x_pos = -30
+        return self.x_pos, self.y_pos, self.direction
+
+    def move_inky(self):
+        # r, l, u, d
+        # inky turns up or down at any point to pursue, but left and right only on collision
+        if self.direction == 0:
+            if self.target[0] > self.x_pos and self.turns[0]:
+                self.x_pos += self.speed
+            elif not self.turns[0]:
+                if self.target[1] > self.y_pos and self.turns[3]:
+                    self.direction = 3
+                    self.y_pos += self.speed
+                elif self.target[1] < self.y_pos and self.turns[2]:
+                    self.direction = 2
+                    self.y_pos -= self.speed
+                elif self.target[0] < self.x_pos and self.turns[1]:
+                    self.direction = 1
+                    self.x_pos -= self.speed
+                elif self.turns[3]:
+                    self.direction = 3
+                    self.y_pos += self.speed
+                elif self.turns[2]:
+                    self.direction = 2
+                    self.y_pos -= self.speed
+                elif self.turns[1]:
+                    self.direction = 1
+                    self.x_pos -= self.speed
+            elif self.turns[0]:
+                if self.target[1] > self.y_pos and self.turns[3]:
+                    self.direction = 3
+                    self.y_pos += self.speed
+                if self.target[1] < self.y_pos and self.turns[2]:
+                    self.direction = 2
+                    self.y_pos -= self.speed
+                else:
+                    self.x_pos += self.speed
+        elif self.direction == 1:
+            if self.target[1] > self.y_pos and self.turns[3]:
+                self.direction = 3
+            elif self.target[0] < self.x_pos and self.turns[1]:
+                self.x_pos -= self.speed
+            elif not self.turns[1]:
+                if self.target[1] > self.y_pos and self.turns[3]:
+                    self.direction = 3
+                    self.y_pos += self.speed
+                elif self.target[1] < self.y_pos and self.turns[2]:
+                    self.direction = 2
+                    self.y_pos -= self.speed
+                elif self.target[0] > self.x_pos and self.turns[0]:
+                    self.direction = 0
+                    self.x_pos += self.speed
+                elif self.turns[3]:
+                    self.direction = 3
+                    self.y_pos += self.speed
+                elif self.turns[2]:
+                    self.direction = 2
+                    self.y_pos -= self.speed
+                elif self.turns[0]:
+                    self.direction = 0
+                    self.x_pos += self.speed
+            elif self.turns[1]:
+                if self.target[1] > self.y_pos and self.turns[3]:
+                    self.direction = 3
+                    self.y_pos += self.speed
+                if self.target[1] < self.y_pos and self.turns[2]:
+                    self.direction = 2
+                    self.y_pos -= self.speed
+                else:
+                    self.x_pos -= self.speed
+        elif self.direction == 2:
+            if self.target[1] < self.y_pos and self.turns[2]:
+                self.direction = 2
+                self.y_pos -= self.speed
+            elif not self.turns[2]:
+                if self.target[0] > self.x_pos and self.turns[0]:
+                    self.direction = 0
+                    self.x_pos += self.speed
+                elif self.target[0] < self.x_pos and self.turns[1]:
+                    self.direction = 1
+                    self.x_pos -= self.speed
+                elif self.target[1] > self.y_pos and self.turns[3]:
+                    self.direction = 3
+                    self.y_pos += self.speed
+                elif self.turns[1]:
+                    self.direction = 1
+                    self.x_pos -= self.speed
+                elif self.turns[3]:
+                    self.direction = 3
+                    self.y_pos += self.speed
+                elif self.turns[0]:
+                    self.direction = 0
+                    self.x_pos += self.speed
+            elif self.turns[2]:
+                self.y_pos -= self.speed
+        elif self.direction == 3:
+            if self.target[1] > self.y_pos and self.turns[3]:
+                self.y_pos += self.speed
+            elif not self.turns[3]:
+                if self.target[0] > self.x_pos and self.turns[0]:
+                    self.direction = 0
+                    self.x_pos += self.speed
+                elif self.target[0] < self.x_pos and self.turns[1]:
+                    self.direction = 1
+                    self.x_pos -= self.speed
+                elif self.target[1] < self.y_pos and self.turns[2]:
+                    self.direction = 2
+                    self.y_pos -= self.speed
+                elif self.turns[2]:
+                    self.direction = 2
+                    self.y_pos -= self.speed
+                elif self.turns[1]:
+                    self.direction = 1
+                    self.x_pos -= self.speed
+                elif self.turns[0]:
+                    self.direction = 0
+                    self.x_pos += self.speed
+            elif self.turns[3]:
+                self.y_pos += self.speed
+        if self.x_pos < -30:
+            self.x_pos = WIDTH
+        elif self.x_pos > WIDTH:
+            self.x_pos = -30
+        return self.x_pos, self.y_pos, self.direction
+
+    def move_pinky(self):
+        # r, l, u, d
+        # pinky is going to turn left or right whenever advantageous, but only up or down on collision
+        if self.direction == 0:
+            if self.target[0] > self.x_pos and self.turns[0]:
+                self.x_pos += self.speed
+            elif not self.turns[0]:
+                if self.target[1] > self.y_pos and self.turns[3]:
+                    self.direction = 3
+                    self.y_pos += self.speed
+                elif self.target[1] < self.y_pos and self.turns[2]:
+                    self.direction = 2
+                    self.y_pos -= self.speed
+                elif self.target[0] < self.x_pos and self.turns[1]:
+                    self.direction = 1
+                    self.x_pos -= self.speed
+                elif self.turns[3]:
+                    self.direction = 3
+                    self.y_pos += self.speed
+                elif self.turns[2]:
+                    self.direction = 2
+                    self.y_pos -= self.speed
+                elif self.turns[1]:
+                    self.direction = 1
+                    self.x_pos -= self.speed
+            elif self.turns[0]:
+                self.x_pos += self.speed
+        elif self.direction == 1:
+            if self.target[1] > self.y_pos and self.turns[3]:
+                self.direction = 3
+            elif self.target[0] < self.x_pos and self.turns[1]:
+                self.x_pos -= self.speed
+            elif not self.turns[1]:
+                if self.target[1] > self.y_pos and self.turns[3]:
+                    self.direction = 3
+                    self.y_pos += self.speed
+                elif self.target[1] < self.y_pos and self.turns[2]:
+                    self.direction = 2
+                    self.y_pos -= self.speed
+                elif self.target[0] > self.x_pos and self.turns[0]:
+                    self.direction = 0
+                    self.x_pos += self.speed
+                elif self.turns[3]:
+                    self.direction = 3
+                    self.y_pos += self.speed
+                elif self.turns[2]:
+                    self.direction = 2
+                    self.y_pos -= self.speed
+                elif self.turns[0]:
+                    self.direction = 0
+                    self.x_pos += self.speed
+            elif self.turns[1]:
+                self.x_pos -= self.speed
+        elif self.direction == 2:
+            if self.target[0] < self.x_pos and self.turns[1]:
+                self.direction = 1
+                self.x_pos -= self.speed
+            elif self.target[1] < self.y_pos and self.turns[2]:
+                self.direction = 2
+                self.y_pos -= self.speed
+            elif not self.turns[2]:
+                if self.target[0] > self.x_pos and self.turns[0]:
+                    self.direction = 0
+                    self.x_pos += self.speed
+                elif self.target[0] < self.x_pos and self.turns[1]:
+                    self.direction = 1
+                    self.x_pos -= self.speed
+                elif self.target[1] > self.y_pos and self.turns[3]:
+                    self.direction = 3
+                    self.y_pos += self.speed
+                elif self.turns[1]:
+                    self.direction = 1
+                    self.x_pos -= self.speed
+                elif self.turns[3]:
+                    self.direction = 3
+                    self.y_pos += self.speed
+                elif self.turns[0]:
+                    self.direction = 0
+                    self.x_pos += self.speed
+            elif self.turns[2]:
+                if self.target[0] > self.x_pos and self.turns[0]:
+                    self.direction = 0
+                    self.x_pos += self.speed
+                elif self.target[0] < self.x_pos and self.turns[1]:
+                    self.direction = 1
+                    self.x_pos -= self.speed
+                else:
+                    self.y_pos -= self.speed
+        elif self.direction == 3:
+            if self.target[1] > self.y_pos and self.turns[3]:
+                self.y_pos += self.speed
+            elif not self.turns[3]:
+                if self.target[0] > self.x_pos and self.turns[0]:
+                    self.direction = 0
+                    self.x_pos += self.speed
+                elif self.target[0] < self.x_pos and self.turns[1]:
+                    self.direction = 1
+                    self.x_pos -= self.speed
+                elif self.target[1] < self.y_pos and self.turns[2]:
+                    self.direction = 2
+                    self.y_pos -= self.speed
+                elif self.turns[2]:
+                    self.direction = 2
+                    self.y_pos -= self.speed
+                elif self.turns[1]:
+                    self.direction = 1
+                    self.x_pos -= self.speed
+                elif self.turns[0]:
+                    self.direction = 0
+                    self.x_pos += self.speed
+            elif self.turns[3]:
+                if self.target[0] > self.x_pos and self.turns[0]:
+                    self.direction = 0
+                    self.x_pos += self.speed
+                elif self.target[0] < self.x_pos and self.turns[1]:
+                    self.direction = 1
+                    self.x_pos -= self.speed
+                else:
+                    self.y_pos += self.speed
+        if self.x_pos < -30:
+            self.x_pos = WIDTH
+        elif self.x_pos > WIDTH:
+            self.x_pos = -30
+        return self.x_pos, self.y_pos, self.direction
+
+
+# Movement policy of each ghost id while it is alive and out of the box
+GHOST_CHASE = (Ghost.move_blinky, Ghost.move_inky, Ghost.move_pinky, Ghost.move_clyde)
+
+_preload_pool = None
+
+
+class CompiledLevel:
+    # Everything a Game derives from a layout. Building one touches no game
+    # state, so the next level can be compiled on a worker thread.
+    def __init__(self, layout, ghost_ai=GHOST_AI_CLASSIC):
+        self.layout = layout
+        # level holds walls only; pellets live in their own layer
+        self.level, self.pellets = split_level(layout.board, layout.cache_path("pellets", PELLET_CACHE_VERSION))
+        self.walk = compile_walk_tables(self.level, layout.cache_path("walk", WALK_CACHE_VERSION))
+        self.house_bounds, self.return_target, self.exit_target = house_points(layout.ghost_house)
+        self.navigation = None
+        self.dead_navigation = None
+        self.shut_in = None
+        if ghost_ai == GHOST_AI_SHORTEST_PATH:
+            # Dead ghosts may path through the gate back into the box
+            self.navigation = compile_navigation(self.level, tunnel_rows=layout.tunnel_rows)
+            self.dead_navigation = compile_navigation(self.level, gate_open=True, tunnel_rows=layout.tunnel_rows)
+            # Tiles the closed gate cuts off from the maze, i.e. inside the box
+            start_x, start_y = layout.player_start
+            maze = self.navigation.flow_field(self.navigation.tile_at(start_x + 23, start_y + 24))
+            self.shut_in = [length == UNREACHABLE for length in maze.distance]
+
+
+def preload_pool():
+    # One worker thread, started the first time a level is preloaded
+    global _preload_pool
+    if _preload_pool is None:
+        _preload_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="level-preload")
+    return _preload_pool
+
+
+class Game:
+    def __init__(
+        self,
+        powerup_frames=None,
+        ghost_speed=None,
+        frightened_speed=None,
+        dead_speed=None,
+        ghost_ai=GHOST_AI_CLASSIC,
+        layout=None,
+        layouts=None,
+    ):
+        # Speeds and powerup_frames left as None follow LEVEL_SETTINGS;
+        # a value given here holds for every level
+        if ghost_ai not in GHOST_AI_MODES:
+            raise ValueError(f"Unknown ghost_ai {ghost_ai!r}; use one of {GHOST_AI_MODES}")
+        self.fixed_settings = (ghost_speed, frightened_speed, dead_speed, powerup_frames)
+        self.level_number = LEVEL_NUMBER
+        self.apply_level_settings()
+        self.counter = 0
+        self.flicker = False
+        self.turns_allowed = [False, False, False, False]
+        # Boards played in turn, levels/classic.lvl by default; each gives the
+        # walls, spawn points and ghost house
+        if layouts is None:
+            layouts = [layout] if layout is not None else levels.level_sequence()
+        self.layouts = list(layouts)
+        self.ghost_ai = ghost_ai
+        self.ghosts = []
+        self.preloaded = None
+        self.use_level(CompiledLevel(self.layouts[0], ghost_ai))
+        player_start = self.layout.player_start
+        self.targets = [player_start, player_start, player_start, player_start]
+        self.ghost_speeds = [self.ghost_speed, self.ghost_speed, self.ghost_speed, self.ghost_speed]
+        self.ghosts = [
+            Ghost(ghost_id, *start, self.walk, self.house_bounds) for ghost_id, start in enumerate(self.layout.ghost_starts)
+        ]
+        for ghost in self.ghosts:
+            ghost.target = player_start
+        self.reset()
+
+    def use_level(self, compiled):
+        self.layout = compiled.layout
+        self.level = compiled.level
+        self.pellets = compiled.pellets
+        self.walk = compiled.walk
+        self.navigation = compiled.navigation
+        self.dead_navigation = compiled.dead_navigation
+        self.shut_in = compiled.shut_in
+        self.house_bounds = compiled.house_bounds
+        self.return_target = compiled.return_target
+        self.exit_target = compiled.exit_target
+        for ghost in self.ghosts:
+            ghost.walk = self.walk
+            ghost.house = self.house_bounds
+            ghost.center_x = None
+            ghost._turns_key = None
+
+    def apply_level_settings(self):
+        row = LEVEL_SETTINGS[min(self.level_number, LEVEL_COUNT) - 1]
+        settings = [value if fixed is None else fixed for value, fixed in zip(row, self.fixed_settings)]
+        self.ghost_speed, self.frightened_speed, self.dead_speed, self.powerup_frames = settings
+
+    def layout_for(self, level_number):
+        return self.layouts[(level_number - 1) % len(self.layouts)]
+
+    def has_next_level(self):
+        return self.level_number < LEVEL_COUNT
+
+    def preload_next_level(self, prepare=None):
+        # Compiles the next level on the preload thread; prepare(compiled), if
+        # given, runs there as well (e.g. to draw its walls)
+        if not self.has_next_level():
+            return
+        layout = self.layout_for(self.level_number + 1)
+
+        def build():
+            compiled = CompiledLevel(layout, self.ghost_ai)
+            if prepare is not None:
+                prepare(compiled)
+            return compiled
+
+        self.preloaded = preload_pool().submit(build)
+
+    def advance_level(self):
+        # Moves on after a cleared board, keeping score and lives
+        layout = self.layout_for(self.level_number + 1)
+        compiled = None
+        if self.preloaded is not None:
+            compiled = self.preloaded.result()
+            self.preloaded = None
+        if compiled is None or compiled.layout is not layout:
+            compiled = CompiledLevel(layout, self.ghost_ai)
+        self.use_level(compiled)
+        self.level_number += 1
+        self.apply_level_settings()
+        self.pellets.reset()
+        self.status = STATUS_PLAYING
+        self.reset_round()
+
+    def reset(self):
+        if self.layout is not self.layouts[0]:
+            self.use_level(CompiledLevel(self.layouts[0], self.ghost_ai))
+        self.pellets.reset()
+        self.score = 0
+        self.lives = DEFAULT_LIVES
+        self.level_number = LEVEL_NUMBER
+        self.apply_level_settings()
+        self.score_pop_timer = 0
+        self.status = STATUS_PLAYING
+        self.ticks = 0
+        self.ghosts_eaten = 0
+        self.reset_round()
+
+    def reset_round(self):
+        self.player_x, self.player_y = self.layout.player_start
+        self.direction = 0
+        self.direction_command = 0
+
+        for ghost, start in zip(self.ghosts, self.layout.ghost_starts):
+            ghost.reset(*start)
+
+        self.startup_counter = 0
+        self.moving = False
+        self.powerup = False
+        self.power_counter = 0
+        self.eaten_ghost = [False, False, False, False]
+
+    def lose_life_or_game_over(self):
+        if self.lives > 1:
+            self.lives -= 1
+            self.reset_round()
+        else:
+            self.lives = 0
+            self.status = STATUS_GAME_OVER
+
+    def entity_positions(self):
+        return [(self.player_x, self.player_y)] + [(ghost.x_pos, ghost.y_pos) for ghost in self.ghosts]
+
+    def check_position(self, centerx, centery):
+        return self.walk.player_turns(centerx, centery, self.direction)
+
+    def move_player(self, play_x, play_y):
+        # r, l, u, d
+        direction = self.direction
+        turns_allowed = self.turns_allowed
+        if direction == 0 and turns_allowed[0]:
+            play_x += PLAYER_SPEED
+        elif direction == 1 and turns_allowed[1]:
+            play_x -= PLAYER_SPEED
+        if direction == 2 and turns_allowed[2]:
+            play_y -= PLAYER_SPEED
+        elif direction == 3 and turns_allowed[3]:
+            play_y += PLAYER_SPEED
+        return play_x, play_y
+
+    def check_collisions(self, scor, power, power_count, eaten_ghosts, center_x, center_y):
+        if 0 < self.player_x < 870:
+            tile = self.pellets.eat(center_y // TILE_HEIGHT, center_x // TILE_WIDTH)
+            if tile == 1:
+                scor += 10
+            if tile == 2:
+                scor += 50
+                power = True
+                power_count = 0
+                eaten_ghosts = [False, False, False, False]
+        return scor, power, power_count, eaten_ghosts
+
+    def leaving_box(self, ghost):
+        # Ghosts on their way out of the box aim above the gate
+        box_x, box_y, box_width, box_height = self.layout.ghost_house
+        near_box = box_x < ghost.x_pos < box_x + box_width and box_y < ghost.y_pos < box_y + box_height
+        if near_box and self.ghost_ai == GHOST_AI_SHORTEST_PATH:
+            # only while the closed gate still cuts them off from the maze
+            return self.shut_in[self.navigation.tile_at(ghost.x_pos + 22, ghost.y_pos + 22)]
+        return near_box
+
+    def get_targets(self, blinky_obj, inky_obj, pinky_obj, clyde_obj):
+        if self.player_x < BOARD_CENTER[0]:
+            runaway_x = WIDTH
+        else:
+            runaway_x = 0
+        if self.player_y < BOARD_CENTER[1]:
+            runaway_y = GAME_HEIGHT
+        else:
+            runaway_y = 0
+        return_target = self.return_target
+        exit_target = self.exit_target
+        if self.powerup:
+            if not blinky_obj.dead and not self.eaten_ghost[0]:
+                blink_target = (runaway_x, runaway_y)
+            elif not blinky_obj.dead and self.eaten_ghost[0]:
+                if self.leaving_box(blinky_obj):
+                    blink_target = exit_target
+                else:
+                    blink_target = (self.player_x, self.player_y)
+            else:
+                blink_target = return_target
+
+            if not inky_obj.dead and not self.eaten_ghost[1]:
+                ink_target = (runaway_x, self.player_y)
+            elif not inky_obj.dead and self.eaten_ghost[1]:
+                if self.leaving_box(inky_obj):
+                    ink_target = exit_target
+                else:
+                    ink_target = (self.player_x, self.player_y)
+            else:
+                ink_target = return_target
+
+            if not pinky_obj.dead:
+                pink_target = (self.player_x, runaway_y)
+            elif not pinky_obj.dead and self.eaten_ghost[2]:
+                if self.leaving_box(pinky_obj):
+                    pink_target = exit_target
+                else:
+                    pink_target = (self.player_x, self.player_y)
+            else:
+                pink_target = return_target
+
+            if not clyde_obj.dead and not self.eaten_ghost[3]:
+                clyde_target = BOARD_CENTER
+            elif not clyde_obj.dead and self.eaten_ghost[3]:
+                if self.leaving_box(clyde_obj):
+                    clyde_target = exit_target
+                else:
+                    clyde_target = (self.player_x, self.player_y)
+            else:
+                clyde_target = return_target
+        else:
+            if not blinky_obj.dead:
+                if self.leaving_box(blinky_obj):
+                    blink_target = exit_target
+                else:
+                    blink_target = (self.player_x, self.player_y)
+            else:
+                blink_target = return_target
+            if not inky_obj.dead:
+                if self.leaving_box(inky_obj):
+                    ink_target = exit_target
+                else:
+                    ink_target = (self.player_x, self.player_y)
+            else:
+                ink_target = return_target
+            if not pinky_obj.dead:
+                if self.leaving_box(pinky_obj):
+                    pink_target = exit_target
+                else:
+                    pink_target = (self.player_x, self.player_y)
+            else:
+                pink_target = return_target
+            if not clyde_obj.dead:
+                if self.leaving_box(clyde_obj):
+                    clyde_target = exit_target
+                else:
+                    clyde_target = (self.player_x, self.player_y)
+            else:
+                clyde_target = return_target
+
+        return [blink_target, ink_target, pink_target, clyde_target]
+
+    def update_ghost_speeds(self):
+        if self.powerup:
+            speed = self.frightened_speed
+        else:
+            speed = self.ghost_speed
+        self.ghost_speeds = [speed, speed, speed, speed]
+        if self.eaten_ghost[0]:
+            self.ghost_speeds[0] = self.ghost_speed
+        if self.eaten_ghost[1]:
+            self.ghost_speeds[1] = self.ghost_speed
+        if self.eaten_ghost[2]:
+            self.ghost_speeds[2] = self.ghost_speed
+        if self.eaten_ghost[3]:
+            self.ghost_speeds[3] = self.ghost_speed
+        for ghost in self.ghosts:
+            if ghost.dead:
+                self.ghost_speeds[ghost.id] = self.dead_speed
+            ghost.speed = self.ghost_speeds[ghost.id]
+
+    def remaining_pellets(self):
+        return self.pellets.remaining > 0
+
+    def count_pellets(self):
+        return self.pellets.remaining
+
+    def add_ghost_score(self):
+        self.ghosts_eaten += 1
+        self.score += (2 ** self.eaten_ghost.count(True)) * 100
+        self.score_pop_timer = 12
+
+    def state_hash(self, previous=0):
+        # crc32 of the full simulation state chained onto previous; feeding each
+        # result back in gives a rolling hash of a whole game (see replay.py)
+        values = [
+            self.player_x, self.player_y, self.direction, self.direction_command, self.score, self.lives,
+            self.level_number, self.ticks, self.counter, self.flicker, self.startup_counter, self.moving,
+            self.powerup, self.power_counter, self.score_pop_timer, self.ghosts_eaten, STATUS_CODES[self.status],
+        ]
+        for ghost in self.ghosts:
+            values += (ghost.x_pos, ghost.y_pos, ghost.direction, ghost.dead, ghost.in_box, ghost.speed, *ghost.target)
+        values += self.eaten_ghost
+        values += self.turns_allowed
+        values += self.ghost_speeds
+        for target in self.targets:
+            values += target
+        return zlib.crc32(self.pellets.cells, zlib.crc32(STATE_LAYOUT.pack(*values), previous))
+
+    def step(self, direction_command=None):
+        if self.status != STATUS_PLAYING:
+            return self.status
+        if direction_command is not None:
+            self.direction_command = direction_command
+        self.ticks += 1
+
+        if self.counter < 19:
+            self.counter += 1
+            if self.counter > 3:
+                self.flicker = False
+        else:
+            self.counter = 0
+            self.flicker = True
+
+        if self.powerup and self.power_counter < self.powerup_frames:
+            self.power_counter += 1
+        elif self.powerup and self.power_counter >= self.powerup_frames:
+            self.power_counter = 0
+            self.powerup = False
+            self.eaten_ghost = [False, False, False, False]
+
+        if self.startup_counter < STARTUP_FRAMES:
+            self.moving = False
+            self.startup_counter += 1
+        else:
+            self.moving = True
+
+        center_x = self.player_x + 23
+        center_y = self.player_y + 24
+        self.turns_allowed[:] = self.check_position(center_x, center_y)
+
+        turns_allowed = self.turns_allowed
+        if self.direction_command == 0 and turns_allowed[0]:
+            self.direction = 0
+        if self.direction_command == 1 and turns_allowed[1]:
+            self.direction = 1
+        if self.direction_command == 2 and turns_allowed[2]:
+            self.direction = 2
+        if self.direction_command == 3 and turns_allowed[3]:
+            self.direction = 3
+
+        self.update_ghost_speeds()
+        ghosts = self.ghosts
+        for ghost in ghosts:
+            ghost.check_collisions()
+        # Ghosts keep steering toward the targets picked on the previous tick
+        targets = self.get_targets(*ghosts)
+
+        if self.moving:
+            self.player_x, self.player_y = self.move_player(self.player_x, self.player_y)
+            for ghost in ghosts:
+                if ghost.in_box:
+                    moved = ghost.move_clyde()
+                elif self.ghost_ai == GHOST_AI_SHORTEST_PATH:
+                    moved = ghost.move_navigate(self.dead_navigation if ghost.dead else self.navigation)
+                elif ghost.dead:
+                    moved = ghost.move_clyde()
+                else:
+                    moved = GHOST_CHASE[ghost.id](ghost)
+                ghost.x_pos, ghost.y_pos, ghost.direction = moved
+        self.targets[:] = targets
+        for ghost in ghosts:
+            ghost.target = targets[ghost.id]
+            ghost.check_collisions()
+
+        if self.player_x > WIDTH:
+            self.player_x = -47
+        elif self.player_x < -50:
+            self.player_x = 897
+
+        center_x = self.player_x + 23
+        center_y = self.player_y + 24
+        player_circle = pygame.Rect((center_x - 20, center_y - 20), (40, 40))
+
+        previous_score = self.score
+        self.score, self.powerup, self.power_counter, self.eaten_ghost = self.check_collisions(
+            self.score, self.powerup, self.power_counter, self.eaten_ghost, center_x, center_y
+        )
+        if self.score > previous_score:
+            self.score_pop_timer = 10
+
+        powerup = self.powerup
+        eaten_ghost = self.eaten_ghost
+        for ghost in ghosts:
+            if not ghost.dead and player_circle.colliderect(ghost.rect) and (not powerup or eaten_ghost[ghost.id]):
+                self.lose_life_or_game_over()
+                return self.status
+
+        if powerup:
+            for ghost in ghosts:
+                if not ghost.dead and not eaten_ghost[ghost.id] and player_circle.colliderect(ghost.rect):
+                    ghost.dead = True
+                    eaten_ghost[ghost.id] = True
+                    self.add_ghost_score()
+
+        for ghost in ghosts:
+            if ghost.in_box and ghost.dead:
+                ghost.dead = False
+
+        if self.score_pop_timer > 0:
+            self.score_pop_timer -= 1
+
+        if not self.remaining_pellets():
+            self.status = STATUS_WIN
+        return self.status
@@ -0,0 +1,202 @@
+"""Level files.
+
+A ``.lvl`` file is a fixed little-endian header followed by the tile grid,
+one byte per tile (the codes of ``board.py``):
+
+    magic "PKLV", version, rows, cols
+    player start (x, y)
+    blinky, inky, pinky, clyde starts (x, y, direction)
+    ghost house (x, y, width, height) in pixels
+    tunnel row count, then that many row numbers (rows whose two ends join up)
+    rows * cols tile bytes
+
+The engine moves and draws on a fixed grid of 30 x 28 px tiles filling the
+window, so only 33-row, 30-column boards are accepted.
+
+``load_level`` memory-maps the file, so the tiles are read straight
+from the page cache. Anything derived from a level (walk tables, the pellet
+mask, drawn wall layers) is saved under ``__lvlcache__`` next to the file,
+named by a hash of the file contents and the version of the code that made
+it, and read back instead of recomputed on later runs. Editing the level
+changes the hash and changing how an artifact is built bumps its version, so
+stale files are never used.
+
+Run ``python levels.py`` to rebuild ``levels/classic.lvl`` from ``board.py``.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import threading
+
+
+MAGIC = b"PKLV"
+VERSION = 1
+HEADER = struct.Struct("<4sHHH2h12h4hH")
+TUNNEL_ROW = struct.Struct("<H")
+LEVEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "levels")
+DEFAULT_LEVEL = os.path.join(LEVEL_DIR, "classic.lvl")
+CACHE_DIR = "__lvlcache__"
+# Files in LEVEL_DIR played in order; the list repeats when a game has more
+# levels than boards
+LEVEL_SEQUENCE = ("classic.lvl",)
+
+# Defaults for boards that do not come from a file (board.py)
+PLAYER_START = (450, 663)
+GHOST_STARTS = ((56, 58, 0), (440, 388, 2), (440, 438, 2), (440, 438, 2))
+GHOST_HOUSE = (340, 340, 220, 160)
+# The only board size the engine's tile grid fits, and the pixel size of a
+# tile on it; every module that maps pixels to tiles takes these
+BOARD_ROWS = 33
+BOARD_COLS = 30
+TILE_WIDTH = 30
+TILE_HEIGHT = 28
+
+
+class LevelFormatError(ValueError):
+    pass
+
+
+class Level:
+    def __init__(self, board, player_start, ghost_starts, ghost_house, tunnel_rows, path=None, content_hash=None):
+        self.board = board
+        self.rows = len(board)
+        self.cols = len(board[0])
+        self.player_start = tuple(player_start)
+        self.ghost_starts = tuple(tuple(start) for start in ghost_starts)
+        self.ghost_house = tuple(ghost_house)
+        self.tunnel_rows = tuple(tunnel_rows)
+        self.path = path
+        self.content_hash = content_hash or hashlib.blake2b(encode_level(self), digest_size=10).hexdigest()
+        self.name = os.path.splitext(os.path.basename(path))[0] if path else "board"
+
+    def __repr__(self):
+        return f"Level({self.name!r}, {self.rows}x{self.cols}, hash={self.content_hash})"
+
+    def cache_path(self, artifact, version):
+        # Where a derived artifact of this level lives; None for in-memory levels.
+        # version is the producer's format/rules version, bumped whenever the
+        # same level would now give a different artifact.
+        if self.path is None:
+            return None
+        folder = os.path.join(os.path.dirname(os.path.abspath(self.path)), CACHE_DIR)
+        return os.path.join(folder, f"{self.name}-{self.content_hash}.v{version}.{artifact}")
+
+
+def find_tunnel_rows(board):
+    return [row for row, tiles in enumerate(board) if tiles[0] < 3 and tiles[-1] < 3]
+
+
+def check_size(rows, cols, path=None):
+    if (rows, cols) != (BOARD_ROWS, BOARD_COLS):
+        raise LevelFormatError(f"{path or 'level'}: board is {rows}x{cols}, only {BOARD_ROWS}x{BOARD_COLS} is supported")
+
+
+def level_from_board(board, player_start=PLAYER_START, ghost_starts=GHOST_STARTS, ghost_house=GHOST_HOUSE):
+    check_size(len(board), len(board[0]))
+    return Level([list(row) for row in board], player_start, ghost_starts, ghost_house, find_tunnel_rows(board))
+
+
+def encode_level(level):
+    flat_starts = [value for start in level.ghost_starts for value in start]
+    header = HEADER.pack(
+        MAGIC, VERSION, level.rows, level.cols, *level.player_start, *flat_starts, *level.ghost_house, len(level.tunnel_rows)
+    )
+    tunnels = b"".join(TUNNEL_ROW.pack(row) for row in level.tunnel_rows)
+    return header + tunnels + bytes(tile for row in level.board for tile in row)
+
+
+def decode_level(data, path=None):
+    if len(data) < HEADER.size:
+        raise LevelFormatError(f"{path or 'level'}: file too short")
+    fields = HEADER.unpack_from(data)
+    magic, version, rows, cols = fields[:4]
+    if magic != MAGIC:
+        raise LevelFormatError(f"{path or 'level'}: not a level file")
+    if version != VERSION:
+        raise LevelFormatError(f"{path or 'level'}: unsupported version {version}")
+    check_size(rows, cols, path)
+    player_start = fields[4:6]
+    ghost_starts = [fields[6 + index * 3:9 + index * 3] for index in range(4)]
+    ghost_house = fields[18:22]
+    tunnel_count = fields[22]
+    offset = HEADER.size
+    if len(data) < offset + tunnel_count * TUNNEL_ROW.size:
+        raise LevelFormatError(f"{path or 'level'}: file too short")
+    tunnel_rows = [TUNNEL_ROW.unpack_from(data, offset + index * TUNNEL_ROW.size)[0] for index in range(tunnel_count)]
+    offset += tunnel_count * TUNNEL_ROW.size
+    if any(row >= rows for row in tunnel_rows):
+        raise LevelFormatError(f"{path or 'level'}: tunnel row outside the board")
+    if len(data) != offset + rows * cols:
+        raise LevelFormatError(f"{path or 'level'}: expected {rows}x{cols} tiles")
+    board = [list(data[offset + row * cols:offset + (row + 1) * cols]) for row in range(rows)]
+    content_hash = hashlib.blake2b(data, digest_size=10).hexdigest()
+    return Level(board, player_start, ghost_starts, ghost_house, tunnel_rows, path, content_hash)
+
+
+def load_level(path):
+    with open(path, "rb") as file:
+        # mmap cannot map an empty file
+        if os.fstat(file.fileno()).st_size == 0:
+            raise LevelFormatError(f"{path}: empty level file")
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return decode_level(data, path)
+
+
+def save_level(level, path):
+    save_artifact(path, encode_level(level))
+
+
+def level_sequence():
+    # Boards in the order they are played
+    return [
+        default_level() if name == os.path.basename(DEFAULT_LEVEL) else load_level(os.path.join(LEVEL_DIR, name))
+        for name in LEVEL_SEQUENCE
+    ]
+
+
+def default_level():
+    # The bundled board file, or board.py itself if the file is missing
+    try:
+        return load_level(DEFAULT_LEVEL)
+    except FileNotFoundError:
+        from board import boards
+
+        return level_from_board(boards)
+
+
+def read_artifact(path):
+    # Bytes of a cached artifact, or None if it has not been built yet
+    if path is None or not os.path.exists(path):
+        return None
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return b""
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return bytes(data)
+
+
+def save_artifact(path, data):
+    # Writes via a temporary file so a crash never leaves half an artifact;
+    # a read-only install just goes without the cache
+    if path is None:
+        return
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(temporary, "wb") as file:
+            file.write(data)
+        os.replace(temporary, path)
+    except OSError:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+if __name__ == "__main__":
+    from board import boards
+
+    target = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_LEVEL
+    save_level(level_from_board(boards), target)
+    print(load_level(target))
@@ -0,0 +1,127 @@
+"""Corridor graph of a board.
+
+Every walkable tile with other than two open neighbours (a junction or a
+dead end) is a node; the runs of tiles between nodes are corridors, kept as
+one directed edge per way through them. An edge knows its length in tiles,
+the direction to take on each step (corners included), whether it crosses a
+tunnel (a wrap between the edge columns) or a gate tile, and the pellets
+lying on it in board order. Anything walking the maze only has a choice to
+make at a node; in between it can follow ``edge.directions`` without looking
+at the board again.
+
+Graphs are built once per board layout, pellet layout, gate setting and
+tunnel rows.
+"""
+
+from navigation import OPPOSITE, compile_navigation
+from walk_tables import board_key
+
+
+GATE = 9
+
+_cache = {}
+
+
+class Edge:
+    __slots__ = ("start", "end", "direction", "tiles", "directions", "length", "pellets", "gate", "tunnel")
+
+    def __init__(self, start, end, tiles, directions, pellets, gate, tunnel):
+        self.start = start
+        self.end = end
+        self.direction = directions[0]
+        # Tiles after start, end included; directions[step] leaves tiles[step - 1]
+        self.tiles = tiles
+        self.directions = directions
+        self.length = len(directions)
+        # (step, tile index) of the pellets the board starts with on this edge
+        self.pellets = pellets
+        self.gate = gate
+        self.tunnel = tunnel
+
+
+class MazeGraph:
+    def __init__(self, level, pellet_cells=None, gate_open=False, tunnel_rows=None):
+        navigation = compile_navigation(level, gate_open, tunnel_rows)
+        self.cols = navigation.cols
+        self.tiles = navigation.tiles
+        self.neighbors = navigation.neighbors
+        self.gate_tiles = {index for index, tile in enumerate(tile for row in level for tile in row) if tile == GATE}
+        self.pellet_cells = pellet_cells
+        self.nodes = [index for index in range(self.tiles) if navigation.walkable[index] and len(self.neighbors[index]) != 2]
+        # exits[node][direction] is the edge leaving that way; None off the nodes
+        self.exits = [None] * self.tiles
+        # along[tile] lists (edge, step) for every edge passing through a corridor tile
+        self.along = [() for _ in range(self.tiles)]
+        self.edges = []
+        for node in self.nodes:
+            self.exits[node] = [None] * 4
+        for node in self.nodes:
+            self._add_exits(node)
+        # A loop with no junction on it still needs one node to hang its edges from
+        for index in range(self.tiles):
+            if navigation.walkable[index] and self.exits[index] is None and not self.along[index]:
+                self.nodes.append(index)
+                self.exits[index] = [None] * 4
+                self._add_exits(index)
+
+    def _add_exits(self, node):
+        for direction, neighbor in self.neighbors[node]:
+            if self.exits[node][direction] is None:
+                self.exits[node][direction] = self._walk(node, direction, neighbor)
+
+    def _walk(self, start, direction, current):
+        tiles = [current]
+        directions = [direction]
+        tunnel = self._wraps(start, current)
+        while self.exits[current] is None:
+            for next_direction, neighbor in self.neighbors[current]:
+                if next_direction != OPPOSITE[direction]:
+                    break
+            tunnel = tunnel or self._wraps(current, neighbor)
+            direction = next_direction
+            current = neighbor
+            tiles.append(current)
+            directions.append(direction)
+        pellets = ()
+        if self.pellet_cells is not None:
+            pellets = tuple((step, tile) for step, tile in enumerate(tiles, 1) if self.pellet_cells[tile])
+        gate = start in self.gate_tiles or any(tile in self.gate_tiles for tile in tiles)
+        edge = Edge(start, current, tuple(tiles), tuple(directions), pellets, gate, tunnel)
+        self.edges.append(edge)
+        for step, tile in enumerate(tiles[:-1], 1):
+            self.along[tile] += ((edge, step),)
+        return edge
+
+    def _wraps(self, tile, neighbor):
+        return abs(tile % self.cols - neighbor % self.cols) > 1
+
+    def is_node(self, tile):
+        return self.exits[tile] is not None
+
+    def edge_at(self, tile, direction):
+        # (edge, step) for heading `direction` from tile, or None if that way is shut
+        exits = self.exits[tile]
+        if exits is not None:
+            edge = exits[direction]
+            return None if edge is None else (edge, 0)
+        for edge, step in self.along[tile]:
+            if edge.directions[step] == direction:
+                return edge, step
+        return None
+
+
+def compile_graph(level, pellets=None, gate_open=False, tunnel_rows=None):
+    # pellets is a PelletLayer (or the board itself) whose starting pellets go on the edges
+    if pellets is None:
+        cells = None
+    elif hasattr(pellets, "initial"):
+        cells = pellets.initial
+    else:
+        cells = bytes(tile if tile in (1, 2) else 0 for row in pellets for tile in row)
+    if tunnel_rows is not None:
+        tunnel_rows = tuple(tunnel_rows)
+    key = (board_key(level), cells, gate_open, tunnel_rows)
+    graph = _cache.get(key)
+    if graph is None:
+        graph = _cache[key] = MazeGraph(level, cells, gate_open, tunnel_rows)
+    return graph
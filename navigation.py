@@ -0,0 +1,154 @@
+"""Shortest paths over the walkable tiles of a board.
+
+A ``FlowField`` is one breadth-first search from a target tile: for every
+tile it holds the path length to the target and the first direction to take
+(0-right, 1-left, 2-up, 3-down). On the level's tunnel rows (every row when
+none are given) moving left off column 0 wraps to the last column and back.
+``NavigationTable.flow_field`` builds a field the first time anything heads
+for that tile and shares it afterwards, so all ghosts chasing the player read
+the same field, and a new search only runs when the player reaches a tile
+nobody has targeted before. Together the cached fields are the all-pairs
+distance and next-hop tables, filled lazily.
+
+Tiles that are not walkable, such as the corners ghosts flee to, are mapped
+to the closest walkable tile first, so any pixel position can be a target.
+Tables are built once per board layout, gate setting and tunnel rows and
+then shared.
+"""
+
+from array import array
+from collections import deque
+
+from levels import TILE_HEIGHT, TILE_WIDTH
+from walk_tables import board_key
+
+
+UNREACHABLE = 0xFFFF
+NO_DIRECTION = 255
+# r, l, u, d as (row step, column step)
+STEPS = ((0, 1), (0, -1), (-1, 0), (1, 0))
+OPPOSITE = (1, 0, 3, 2)
+
+_cache = {}
+
+
+class FlowField:
+    def __init__(self, navigation, target):
+        self.target = target
+        self.distance = array("H", [UNREACHABLE]) * navigation.tiles
+        self.next_hop = bytearray([NO_DIRECTION]) * navigation.tiles
+        if not navigation.walkable[target]:
+            return
+        # Walking the BFS tree back toward target gives every tile's first step
+        distance = self.distance
+        next_hop = self.next_hop
+        neighbors = navigation.neighbors
+        distance[target] = 0
+        queue = deque([target])
+        while queue:
+            index = queue.popleft()
+            steps = distance[index] + 1
+            for direction, neighbor in neighbors[index]:
+                if distance[neighbor] == UNREACHABLE:
+                    distance[neighbor] = steps
+                    next_hop[neighbor] = OPPOSITE[direction]
+                    queue.append(neighbor)
+
+
+class NavigationTable:
+    def __init__(self, level, gate_open=False, tunnel_rows=None):
+        self.rows = len(level)
+        self.cols = len(level[0])
+        self.tiles = self.rows * self.cols
+        # Rows whose ends join up; None lets every row wrap
+        self.wraps = [tunnel_rows is None or row in tunnel_rows for row in range(self.rows)]
+        self.walkable = [tile < 3 or (gate_open and tile == 9) for row in level for tile in row]
+        self.neighbors = [self._neighbors(index) for index in range(self.tiles)]
+        self.nearest = self._nearest_walkable()
+        self.fields = {}
+
+    def _neighbors(self, index):
+        # (direction, neighbor index) pairs for walkable neighbors of a walkable tile
+        if not self.walkable[index]:
+            return ()
+        row, col = divmod(index, self.cols)
+        result = []
+        for direction, (row_step, col_step) in enumerate(STEPS):
+            next_row = row + row_step
+            next_col = col + col_step
+            if not 0 <= next_col < self.cols and not self.wraps[row]:
+                continue
+            if 0 <= next_row < self.rows:
+                neighbor = next_row * self.cols + next_col % self.cols
+                if self.walkable[neighbor]:
+                    result.append((direction, neighbor))
+        return tuple(result)
+
+    def _nearest_walkable(self):
+        # Multi-source BFS over the whole grid, ignoring walls
+        nearest = [index if self.walkable[index] else None for index in range(self.tiles)]
+        queue = deque(index for index in range(self.tiles) if self.walkable[index])
+        while queue:
+            index = queue.popleft()
+            row, col = divmod(index, self.cols)
+            for row_step, col_step in STEPS:
+                next_row = row + row_step
+                next_col = col + col_step
+                if 0 <= next_row < self.rows and 0 <= next_col < self.cols:
+                    neighbor = next_row * self.cols + next_col
+                    if nearest[neighbor] is None:
+                        nearest[neighbor] = nearest[index]
+                        queue.append(neighbor)
+        return nearest
+
+    def fill(self):
+        # Builds the field of every walkable tile up front
+        for target in range(self.tiles):
+            if self.walkable[target]:
+                self.flow_field(target)
+        return self
+
+    def flow_field(self, target):
+        field = self.fields.get(target)
+        if field is None:
+            field = self.fields[target] = FlowField(self, target)
+        return field
+
+    def tile_at(self, center_x, center_y):
+        # Closest walkable tile index to a pixel position
+        row = center_y // TILE_HEIGHT
+        if row < 0:
+            row = 0
+        elif row >= self.rows:
+            row = self.rows - 1
+        col = (center_x // TILE_WIDTH) % self.cols
+        return self.nearest[row * self.cols + col]
+
+    def neighbor(self, index, direction):
+        # Grid neighbor of a tile, wrapping columns; may be a wall
+        row, col = divmod(index, self.cols)
+        row_step, col_step = STEPS[direction]
+        row = min(max(row + row_step, 0), self.rows - 1)
+        return row * self.cols + (col + col_step) % self.cols
+
+    def direction(self, source, target):
+        return self.flow_field(target).next_hop[source]
+
+    def path_length(self, source, target):
+        return self.flow_field(target).distance[source]
+
+    def direction_to(self, center_x, center_y, target_x, target_y):
+        # First step from one pixel position toward another, NO_DIRECTION if
+        # already on the target tile or it cannot be reached
+        return self.direction(self.tile_at(center_x, center_y), self.tile_at(target_x, target_y))
+
+
+def compile_navigation(level, gate_open=False, tunnel_rows=None):
+    # tunnel_rows comes from levels.Level; None lets every row wrap
+    if tunnel_rows is not None:
+        tunnel_rows = tuple(tunnel_rows)
+    key = (board_key(level), gate_open, tunnel_rows)
+    table = _cache.get(key)
+    if table is None:
+        table = _cache[key] = NavigationTable(level, gate_open, tunnel_rows)
+    return table
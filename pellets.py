@@ -0,0 +1,91 @@
+"""Pellet state kept apart from the maze walls.
+
+A board from ``board.py`` mixes walls with pellets (1) and power pellets (2).
+``split_level`` returns the walls-only board, which never changes during a
+level, and a ``PelletLayer``: one byte per tile plus a running count of the
+pellets left, so eating is a single write, the win check is a counter test
+and starting over copies a prebuilt byte string.
+"""
+
+import itertools
+
+import levels
+
+
+PELLET = 1
+POWER_PELLET = 2
+# cells -> b"0"/b"1" digits and digits -> 0x00/0xFF masks, for the bitset
+TO_DIGITS = bytes([ord("0")] + [ord("1")] * 255)
+TO_MASK = bytes(0xFF if value == ord("1") else 0 for value in range(256))
+# Bump when the pellet mask encoding changes, so cached masks are rebuilt
+PELLET_CACHE_VERSION = 1
+
+
+class PelletLayer:
+    def __init__(self, level, initial=None):
+        self.rows = len(level)
+        self.cols = len(level[0])
+        if initial is None:
+            initial = bytes(tile if tile in (PELLET, POWER_PELLET) else 0 for row in level for tile in row)
+        self.initial = initial
+        self.total = self.rows * self.cols - self.initial.count(0)
+        self.cells = bytearray(self.initial)
+        self.remaining = self.total
+        # (row, col) of every pellet eaten since the last reset, in order.
+        # generation changes on reset so drawing code can tell the log restarted.
+        self.eaten = []
+        self.generation = 0
+
+    def reset(self):
+        self.cells[:] = self.initial
+        self.remaining = self.total
+        self.eaten = []
+        self.generation += 1
+
+    def get(self, row, col):
+        return self.cells[row * self.cols + col]
+
+    def eat(self, row, col):
+        # Returns the pellet kind that was on the tile, 0 if it was empty
+        index = row * self.cols + col
+        tile = self.cells[index]
+        if tile:
+            self.cells[index] = 0
+            self.remaining -= 1
+            self.eaten.append((row, col))
+        return tile
+
+    def to_bits(self):
+        # One bit per tile, set where a pellet is left; the kinds come from initial
+        size = len(self.cells)
+        return int(self.cells.translate(TO_DIGITS), 2).to_bytes((size + 7) // 8, "little")
+
+    def load_bits(self, data):
+        size = len(self.cells)
+        digits = format(int.from_bytes(data, "little"), f"0{size}b").encode("ascii")
+        if len(digits) != size:
+            raise ValueError("pellet bitset does not fit this board")
+        mask = int.from_bytes(digits.translate(TO_MASK), "big")
+        self.cells[:] = (mask & int.from_bytes(self.initial, "big")).to_bytes(size, "big")
+        self.remaining = size - self.cells.count(0)
+        self.eaten = []
+        self.generation += 1
+
+    def __iter__(self):
+        # Yields (row, col, kind) for the live pellets only
+        cells = self.cells
+        for index in itertools.compress(range(len(cells)), cells):
+            row, col = divmod(index, self.cols)
+            yield row, col, cells[index]
+
+
+def split_level(level, cache_path=None):
+    # cache_path (see levels.Level.cache_path) keeps the pellet mask on disk
+    walls = [[0 if tile in (PELLET, POWER_PELLET) else tile for tile in row] for row in level]
+    initial = levels.read_artifact(cache_path)
+    if initial is not None and len(initial) != len(level) * len(level[0]):
+        initial = None
+    layer = PelletLayer(level, initial)
+    if initial is None and cache_path is not None:
+        levels.save_artifact(cache_path, layer.initial)
+    return walls, layer
@@ -0,0 +1,163 @@
+"""Input policies that drive ``engine.Game`` without a keyboard.
+
+A policy is built from a seed and then called once per tick with the game;
+it returns the direction command for that tick (0-right, 1-left, 2-up,
+3-down). Any class with that shape can be plugged into ``simulate.py`` as
+``module:ClassName``.
+"""
+
+import heapq
+import importlib
+import itertools
+import random
+
+from levels import TILE_HEIGHT, TILE_WIDTH
+from maze_graph import compile_graph
+
+
+# r, l, u, d as (row step, column step)
+STEPS = ((0, 1), (0, -1), (-1, 0), (1, 0))
+
+
+def player_tile(game):
+    return (game.player_y + 24) // TILE_HEIGHT, (game.player_x + 23) // TILE_WIDTH
+
+
+class IdlePolicy:
+    # Never touches the controls; useful as a floor for score statistics.
+    def __init__(self, seed=0):
+        self.seed = seed
+
+    def __call__(self, game):
+        return game.direction_command
+
+
+class RandomPolicy:
+    def __init__(self, seed=0, switch_chance=0.03):
+        self.random = random.Random(seed)
+        self.switch_chance = switch_chance
+        self.command = 0
+
+    def __call__(self, game):
+        if self.random.random() < self.switch_chance:
+            self.command = self.random.randrange(4)
+        return self.command
+
+
+class GreedyPolicy:
+    # Heads for the nearest pellet over the corridor graph, treating tiles
+    # next to dangerous ghosts as walls. Only picks a way at junctions, or
+    # when a ghost shows up on the corridor ahead; in between it follows the
+    # corridor it chose.
+    def __init__(self, seed=0, wander_chance=0.05):
+        self.random = random.Random(seed)
+        self.wander_chance = wander_chance
+        self.last_tile = None
+        self.command = 0
+        self.edge = None
+        self.graph = None
+        self.graph_level = None
+
+    def __call__(self, game):
+        tile = player_tile(game)
+        if tile != self.last_tile:
+            self.last_tile = tile
+            if self.random.random() < self.wander_chance:
+                self.command = self.random.randrange(4)
+                self.edge = None
+            else:
+                self.command = self.decide(game, tile)
+        return self.command
+
+    def danger_tiles(self, game, graph):
+        blocked = set()
+        rows = graph.tiles // graph.cols
+        for ghost in game.ghosts:
+            if ghost.dead or (game.powerup and not game.eaten_ghost[ghost.id]):
+                continue
+            row = (ghost.y_pos + 22) // TILE_HEIGHT
+            col = (ghost.x_pos + 22) // TILE_WIDTH
+            for row_step, col_step in ((0, 0),) + STEPS:
+                if 0 <= row + row_step < rows:
+                    blocked.add((row + row_step) * graph.cols + (col + col_step) % graph.cols)
+        return blocked
+
+    def decide(self, game, tile):
+        if game.level is not self.graph_level:
+            self.graph = compile_graph(game.level, game.pellets, tunnel_rows=game.layout.tunnel_rows)
+            self.graph_level = game.level
+        graph = self.graph
+        index = tile[0] * graph.cols + tile[1] % graph.cols
+        if not 0 <= index < graph.tiles:
+            return self.command
+        blocked = self.danger_tiles(game, graph)
+        if self.edge is not None and not graph.is_node(index):
+            for edge, step in graph.along[index]:
+                if edge is self.edge:
+                    if blocked.isdisjoint(edge.tiles[step:]):
+                        return edge.directions[step]
+                    break
+        return self.plan(game, graph, index, blocked)
+
+    def plan(self, game, graph, start, blocked):
+        # Dijkstra over the nodes; a pellet partway along an edge ends the search
+        cells = game.pellets.cells
+        if graph.is_node(start):
+            starts = [(edge, 0) for edge in graph.exits[start] if edge is not None]
+        else:
+            starts = list(graph.along[start])
+        best = None
+        costs = {start: 0}
+        heap = []
+        order = itertools.count()
+
+        def follow(edge, step, cost, first):
+            nonlocal best
+            stop = edge.length
+            if not blocked.isdisjoint(edge.tiles[step:]):
+                stop = next(s for s in range(step, edge.length) if edge.tiles[s] in blocked)
+            for pellet_step, tile in edge.pellets:
+                if pellet_step > stop:
+                    break
+                if pellet_step > step and cells[tile]:
+                    if best is None or cost + pellet_step - step < best[0]:
+                        best = (cost + pellet_step - step, first)
+                    break
+            if stop == edge.length:
+                end_cost = cost + edge.length - step
+                if end_cost < costs.get(edge.end, end_cost + 1):
+                    costs[edge.end] = end_cost
+                    heapq.heappush(heap, (end_cost, next(order), edge.end, first))
+
+        for edge, step in starts:
+            follow(edge, step, 0, (edge, step))
+        while heap:
+            cost, _, node, first = heapq.heappop(heap)
+            if best is not None and cost >= best[0]:
+                break
+            if cost > costs[node]:
+                continue
+            for edge in graph.exits[node]:
+                if edge is not None:
+                    follow(edge, 0, cost, first)
+        if best is None:
+            self.edge = None
+            return self.command
+        self.edge, step = best[1]
+        return self.edge.directions[step]
+
+
+POLICIES = {
+    "idle": IdlePolicy,
+    "random": RandomPolicy,
+    "greedy": GreedyPolicy,
+}
+
+
+def load_policy(name):
+    if name in POLICIES:
+        return POLICIES[name]
+    module_name, _, attribute = name.partition(":")
+    if not attribute:
+        raise ValueError(f"Unknown policy {name!r}; use one of {sorted(POLICIES)} or module:ClassName")
+    return getattr(importlib.import_module(module_name), attribute)
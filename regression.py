@@ -0,0 +1,106 @@
+"""Replay regression corpus.
+
+``record`` plays bot games and saves each one as a replay that keeps the
+rolling state hash of every tick. ``check`` re-runs every replay of a corpus
+headless on all cores and reports, per replay, the first tick where the state
+no longer matches the recording. A change that should not alter gameplay
+(a faster ``Ghost.check_collisions``, a new table in ``Game.step``) is proven
+behaviour-preserving when ``check`` passes on a corpus recorded before it.
+
+Examples:
+    python regression.py record corpus --games 2000
+    python regression.py record corpus --games 500 --ghost-ai shortest_path --seed 2000
+    python regression.py check corpus
+"""
+
+import argparse
+import concurrent.futures
+import glob
+import os
+import sys
+import time
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import engine
+import policies
+import replay
+
+
+DEFAULT_MAX_TICKS = 60 * 60 * 15
+
+
+def record_one(job):
+    seed, folder, policy_name, ghost_ai, max_ticks = job
+    game = engine.Game(ghost_ai=ghost_ai)
+    recorder = replay.record_game(game, policies.load_policy(policy_name)(seed), max_ticks)
+    path = os.path.join(folder, f"{policy_name.replace(':', '-')}-{ghost_ai}-{seed:06d}.pkr")
+    recorder.save(path)
+    return recorder.ticks
+
+
+def check_one(path):
+    try:
+        return path, replay.verify(replay.Replay.load(path)), None
+    except replay.ReplayError as error:
+        return path, None, str(error)
+
+
+def record(args):
+    os.makedirs(args.corpus, exist_ok=True)
+    jobs = [(seed, args.corpus, args.policy, args.ghost_ai, args.max_ticks) for seed in range(args.seed, args.seed + args.games)]
+    started = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as executor:
+        ticks = sum(executor.map(record_one, jobs, chunksize=max(1, len(jobs) // (args.workers * 8))))
+    print(f"recorded {len(jobs)} replays ({ticks} ticks) in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+def check(args):
+    paths = sorted(glob.glob(os.path.join(args.corpus, "*.pkr")))
+    if not paths:
+        print(f"no replays in {args.corpus}")
+        return 1
+    started = time.perf_counter()
+    failures = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for path, divergence, error in executor.map(check_one, paths, chunksize=max(1, len(paths) // (args.workers * 8))):
+            if error is not None:
+                failures += 1
+                print(f"{path}: {error}")
+            elif divergence is not None:
+                failures += 1
+                first, last = divergence
+                where = f"tick {first}" if first == last else f"ticks {first}-{last}"
+                print(f"{path}: diverges at {where}")
+    elapsed = time.perf_counter() - started
+    print(f"{len(paths) - failures}/{len(paths)} replays match in {elapsed:.1f}s")
+    return 1 if failures else 0
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    record_parser = commands.add_parser("record", help="record a corpus of bot games")
+    record_parser.add_argument("corpus", help="folder to write replays into")
+    record_parser.add_argument("--games", type=int, default=200)
+    record_parser.add_argument("--seed", type=int, default=0, help="seed of the first game; game i uses seed + i")
+    record_parser.add_argument("--policy", default="greedy", help=f"one of {sorted(policies.POLICIES)} or module:ClassName")
+    record_parser.add_argument("--ghost-ai", choices=engine.GHOST_AI_MODES, default=engine.GHOST_AI_CLASSIC)
+    record_parser.add_argument("--max-ticks", type=int, default=DEFAULT_MAX_TICKS)
+    check_parser = commands.add_parser("check", help="re-run a corpus and report divergences")
+    check_parser.add_argument("corpus", help="folder of replays")
+    for command_parser in (record_parser, check_parser):
+        command_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "record":
+        return record(args)
+    return check(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
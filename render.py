@@ -0,0 +1,188 @@
+"""Cached board drawing.
+
+Walls and the ghost gate never change during a level, so they are drawn once
+per board into a wall layer. The board surface is that layer plus the live
+pellets; it is patched in place when the pellet layer logs an eaten pellet or
+the power-pellet flicker toggles, so drawing the board is a single blit.
+"""
+
+import io
+import math
+
+import pygame
+
+import levels
+from walk_tables import board_key
+
+
+BOARD_COLOR = (40, 108, 222)
+GATE_COLOR = "white"
+PELLET_COLOR = "white"
+PI = math.pi
+# Bump when draw_walls changes, so cached wall layers are redrawn
+WALL_CACHE_VERSION = 1
+
+_wall_layers = {}
+
+
+def draw_walls(surface, level, tile_width, tile_height):
+    num1 = tile_height
+    num2 = tile_width
+    for i in range(len(level)):
+        for j in range(len(level[i])):
+            if level[i][j] == 3:
+                pygame.draw.line(
+                    surface,
+                    BOARD_COLOR,
+                    (j * num2 + (0.5 * num2), i * num1),
+                    (j * num2 + (0.5 * num2), i * num1 + num1),
+                    3,
+                )
+            if level[i][j] == 4:
+                pygame.draw.line(
+                    surface,
+                    BOARD_COLOR,
+                    (j * num2, i * num1 + (0.5 * num1)),
+                    (j * num2 + num2, i * num1 + (0.5 * num1)),
+                    3,
+                )
+            if level[i][j] == 5:
+                pygame.draw.arc(
+                    surface,
+                    BOARD_COLOR,
+                    [(j * num2 - (num2 * 0.4)) - 2, (i * num1 + (0.5 * num1)), num2, num1],
+                    0,
+                    PI / 2,
+                    3,
+                )
+            if level[i][j] == 6:
+                pygame.draw.arc(
+                    surface,
+                    BOARD_COLOR,
+                    [(j * num2 + (num2 * 0.5)), (i * num1 + (0.5 * num1)), num2, num1],
+                    PI / 2,
+                    PI,
+                    3,
+                )
+            if level[i][j] == 7:
+                pygame.draw.arc(
+                    surface,
+                    BOARD_COLOR,
+                    [(j * num2 + (num2 * 0.5)), (i * num1 - (0.4 * num1)), num2, num1],
+                    PI,
+                    3 * PI / 2,
+                    3,
+                )
+            if level[i][j] == 8:
+                pygame.draw.arc(
+                    surface,
+                    BOARD_COLOR,
+                    [(j * num2 - (num2 * 0.4)) - 2, (i * num1 - (0.4 * num1)), num2, num1],
+                    3 * PI / 2,
+                    2 * PI,
+                    3,
+                )
+            if level[i][j] == 9:
+                pygame.draw.line(
+                    surface,
+                    GATE_COLOR,
+                    (j * num2, i * num1 + (0.5 * num1)),
+                    (j * num2 + num2, i * num1 + (0.5 * num1)),
+                    3,
+                )
+
+
+def wall_layer(level, tile_width, tile_height, cache_path=None):
+    # One opaque surface per distinct board layout, shared across resets;
+    # cache_path (see levels.Level.cache_path) keeps it on disk as a PNG
+    key = (board_key(level), tile_width, tile_height)
+    layer = _wall_layers.get(key)
+    if layer is None:
+        size = (len(level[0]) * tile_width, len(level) * tile_height)
+        data = levels.read_artifact(cache_path)
+        if data is not None:
+            image = pygame.image.load(io.BytesIO(data), "walls.png")
+            if image.get_size() == size:
+                # Same pixel format as a freshly drawn layer
+                layer = pygame.Surface(size)
+                layer.blit(image, (0, 0))
+        if layer is None:
+            layer = pygame.Surface(size)
+            layer.fill("black")
+            draw_walls(layer, level, tile_width, tile_height)
+            if cache_path is not None:
+                data = io.BytesIO()
+                pygame.image.save(layer, data, "walls.png")
+                levels.save_artifact(cache_path, data.getvalue())
+        _wall_layers[key] = layer
+    return layer
+
+
+class BoardRenderer:
+    def __init__(self, tile_width, tile_height):
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+        self.pellets = None
+        self.generation = None
+        self.walls = None
+        self.surface = None
+        self.eaten_count = 0
+        self.flicker = False
+        self.power_pellets = []
+
+    def tile_rect(self, row, col):
+        return pygame.Rect(col * self.tile_width, row * self.tile_height, self.tile_width, self.tile_height)
+
+    def wall_layer(self, level, layout=None):
+        # Also called off the main thread to have the next level's walls ready
+        cache_path = None
+        if layout is not None:
+            cache_path = layout.cache_path(f"walls-{self.tile_width}x{self.tile_height}.png", WALL_CACHE_VERSION)
+        return wall_layer(level, self.tile_width, self.tile_height, cache_path)
+
+    def draw_pellet(self, row, col, tile):
+        # Restores the tile from the wall layer, then draws whatever pellet is left
+        rect = self.tile_rect(row, col)
+        self.surface.blit(self.walls, rect, rect)
+        if tile == 1:
+            pygame.draw.circle(self.surface, PELLET_COLOR, rect.center, 4)
+        if tile == 2 and not self.flicker:
+            pygame.draw.circle(self.surface, PELLET_COLOR, rect.center, 10)
+        return rect
+
+    def rebuild(self, level, pellets, flicker, layout=None):
+        self.pellets = pellets
+        self.generation = pellets.generation
+        self.flicker = flicker
+        self.walls = self.wall_layer(level, layout)
+        self.surface = self.walls.copy()
+        self.eaten_count = len(pellets.eaten)
+        self.power_pellets = []
+        for row, col, tile in pellets:
+            if tile == 2:
+                self.power_pellets.append((row, col))
+            self.draw_pellet(row, col, tile)
+
+    def update(self, game):
+        # Brings the board surface up to date and returns the rects that changed
+        pellets = game.pellets
+        if pellets is not self.pellets or pellets.generation != self.generation:
+            self.rebuild(game.level, pellets, game.flicker, game.layout)
+            return [self.surface.get_rect()]
+        changed = []
+        for row, col in pellets.eaten[self.eaten_count:]:
+            changed.append(self.draw_pellet(row, col, pellets.get(row, col)))
+        self.eaten_count = len(pellets.eaten)
+        if game.flicker != self.flicker:
+            self.flicker = game.flicker
+            for row, col in self.power_pellets:
+                changed.append(self.draw_pellet(row, col, pellets.get(row, col)))
+        return changed
+
+    def draw(self, surface, game):
+        self.update(game)
+        surface.blit(self.surface, (0, 0))
+
+    def restore(self, surface, rect):
+        # Redraws the board under rect, e.g. where a sprite was
+        surface.blit(self.surface, rect, rect)
@@ -0,0 +1,308 @@
+"""Recorded games.
+
+The engine is deterministic given the direction command of every tick, so a
+replay is just those commands plus enough context to start an identical
+game:
+
+    magic "PKRP", version, hash of the first board, ghost AI, the four
+    speed/powerup settings (0xFFFF = per-level table), tick count, and the
+    animation counter, flicker and ghost targets carried over from any
+    earlier game on the same Game object
+    state hash interval and count, then the hashes (version 2; 0 and none
+    when the recording did not keep them)
+    runs of equal commands, each one unsigned LEB128 varint of
+    (run length - 1) << 2 | command
+
+With an interval of k, every k-th tick stores the rolling
+``Game.state_hash`` up to that tick, so ``verify`` can name the tick where a
+re-run first stops matching the recording.
+
+A five-minute session is usually well under a kilobyte. ``play`` steps a
+replay with no frame limiter; ``python replay.py FILE`` does that headless
+and prints the outcome, ``--render`` draws every tick as fast as it can.
+"""
+
+import argparse
+import os
+import struct
+import time
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import engine
+
+
+MAGIC = b"PKRP"
+VERSION = 2
+HEADER = struct.Struct("<4sH10sB4HIBB8h")
+CHECKS = struct.Struct("<HI")
+STATE_HASH = struct.Struct("<I")
+UNSET = 0xFFFF
+
+
+class ReplayError(ValueError):
+    pass
+
+
+class ReplayRecorder:
+    # Call record() with the command of each tick right before game.step(),
+    # and checkpoint() right after it when hash_interval is set
+    def __init__(self, game, hash_interval=0):
+        self.board_hash = game.layouts[0].content_hash
+        self.ghost_ai = game.ghost_ai
+        self.settings = game.fixed_settings
+        self.counter = game.counter
+        self.flicker = game.flicker
+        self.targets = [tuple(target) for target in game.targets]
+        self.runs = bytearray()
+        self.ticks = 0
+        self.command = None
+        self.run_length = 0
+        self.hash_interval = hash_interval
+        self.rolling_hash = 0
+        self.hashes = []
+
+    def checkpoint(self, game):
+        if self.hash_interval:
+            self.rolling_hash = game.state_hash(self.rolling_hash)
+            if self.ticks % self.hash_interval == 0:
+                self.hashes.append(self.rolling_hash)
+
+    def record(self, command):
+        self.ticks += 1
+        if command == self.command:
+            self.run_length += 1
+            return
+        self.runs += encode_run(self.command, self.run_length)
+        self.command = command
+        self.run_length = 1
+
+    def to_bytes(self):
+        runs = self.runs + encode_run(self.command, self.run_length)
+        header = HEADER.pack(
+            MAGIC,
+            VERSION,
+            bytes.fromhex(self.board_hash),
+            engine.GHOST_AI_MODES.index(self.ghost_ai),
+            *(UNSET if value is None else value for value in self.settings),
+            self.ticks,
+            self.counter,
+            self.flicker,
+            *(value for target in self.targets for value in target),
+        )
+        checks = CHECKS.pack(self.hash_interval, len(self.hashes))
+        hashes = b"".join(STATE_HASH.pack(value) for value in self.hashes)
+        return header + checks + hashes + bytes(runs)
+
+    def save(self, path):
+        with open(path, "wb") as replay_file:
+            replay_file.write(self.to_bytes())
+
+
+class Replay:
+    def __init__(self, board_hash, ghost_ai, settings, ticks, counter, flicker, targets, runs, hash_interval=0, hashes=()):
+        self.board_hash = board_hash
+        self.ghost_ai = ghost_ai
+        self.settings = settings
+        self.ticks = ticks
+        self.counter = counter
+        self.flicker = flicker
+        self.targets = targets
+        # [(command, run length), ...]
+        self.runs = runs
+        self.hash_interval = hash_interval
+        self.hashes = hashes
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < HEADER.size:
+            raise ReplayError("replay too short")
+        fields = HEADER.unpack_from(data)
+        if fields[0] != MAGIC:
+            raise ReplayError("not a replay file")
+        if fields[1] not in (1, VERSION):
+            raise ReplayError(f"unsupported replay version {fields[1]}")
+        settings = tuple(None if value == UNSET else value for value in fields[4:8])
+        targets = [tuple(fields[11 + index * 2:13 + index * 2]) for index in range(4)]
+        offset = HEADER.size
+        hash_interval = 0
+        hashes = ()
+        if fields[1] >= 2:
+            if len(data) < offset + CHECKS.size:
+                raise ReplayError("replay too short")
+            hash_interval, count = CHECKS.unpack_from(data, offset)
+            offset += CHECKS.size
+            if len(data) < offset + count * STATE_HASH.size:
+                raise ReplayError("replay ends inside its state hashes")
+            hashes = [value for (value,) in STATE_HASH.iter_unpack(data[offset:offset + count * STATE_HASH.size])]
+            offset += count * STATE_HASH.size
+        runs = []
+        while offset < len(data):
+            value, offset = read_varint(data, offset)
+            runs.append((value & 3, (value >> 2) + 1))
+        if sum(length for _, length in runs) != fields[8]:
+            raise ReplayError("replay command stream does not match its tick count")
+        return cls(
+            fields[2].hex(),
+            engine.GHOST_AI_MODES[fields[3]],
+            settings,
+            fields[8],
+            fields[9],
+            bool(fields[10]),
+            targets,
+            runs,
+            hash_interval,
+            hashes,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as replay_file:
+            return cls.from_bytes(replay_file.read())
+
+    def commands(self):
+        for command, length in self.runs:
+            for _ in range(length):
+                yield command
+
+    def new_game(self, layouts=None):
+        # A Game in the state the recording started from
+        ghost_speed, frightened_speed, dead_speed, powerup_frames = self.settings
+        game = engine.Game(
+            powerup_frames=powerup_frames,
+            ghost_speed=ghost_speed,
+            frightened_speed=frightened_speed,
+            dead_speed=dead_speed,
+            ghost_ai=self.ghost_ai,
+            layouts=layouts,
+        )
+        if game.layouts[0].content_hash != self.board_hash:
+            raise ReplayError(f"replay was recorded on board {self.board_hash}, not {game.layouts[0].content_hash}")
+        game.counter = self.counter
+        game.flicker = self.flicker
+        game.targets[:] = self.targets
+        for ghost, target in zip(game.ghosts, self.targets):
+            ghost.target = target
+        return game
+
+
+def write_varint(buffer, value):
+    while value >= 0x80:
+        buffer.append(value & 0x7F | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def read_varint(data, offset):
+    value = 0
+    shift = 0
+    while True:
+        if offset >= len(data):
+            raise ReplayError("replay ends inside a command run")
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def encode_run(command, length):
+    buffer = bytearray()
+    if length:
+        write_varint(buffer, (length - 1) << 2 | command)
+    return buffer
+
+
+def play(replay, game=None, on_tick=None):
+    # Steps the whole replay as fast as possible, moving on to the next level
+    # after a cleared board like main.py does. on_tick(game) runs after each
+    # step; returning True from it stops playback there.
+    if game is None:
+        game = replay.new_game()
+    for command in replay.commands():
+        status = game.step(command)
+        if on_tick is not None and on_tick(game):
+            break
+        if status == engine.STATUS_WIN and game.has_next_level():
+            game.advance_level()
+        elif status != engine.STATUS_PLAYING:
+            break
+    return game
+
+
+def record_game(game, policy, max_ticks, hash_interval=1):
+    # Plays policy to the end of the game, stepping exactly like play()
+    recorder = ReplayRecorder(game, hash_interval)
+    while game.status == engine.STATUS_PLAYING and game.ticks < max_ticks:
+        command = policy(game)
+        recorder.record(command)
+        status = game.step(command)
+        recorder.checkpoint(game)
+        if status == engine.STATUS_WIN and game.has_next_level():
+            game.advance_level()
+    return recorder
+
+
+def verify(replay):
+    # Re-runs a replay that kept state hashes. Returns None when every stored
+    # hash matches, else the (first, last) tick the first divergence lies in.
+    if not replay.hash_interval:
+        raise ReplayError("replay has no state hashes to verify against")
+    interval = replay.hash_interval
+    rolling_hash = 0
+    ticks = 0
+    divergence = None
+
+    def check(game):
+        nonlocal rolling_hash, ticks, divergence
+        ticks += 1
+        rolling_hash = game.state_hash(rolling_hash)
+        if ticks % interval == 0 and ticks // interval <= len(replay.hashes):
+            if replay.hashes[ticks // interval - 1] != rolling_hash:
+                divergence = (ticks - interval + 1, ticks)
+                return True
+        return False
+
+    play(replay, on_tick=check)
+    if divergence is None and ticks != replay.ticks:
+        # The game ended early (or ran on past where it should have)
+        divergence = (ticks, ticks)
+    return divergence
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play back a recorded game at full speed.")
+    parser.add_argument("replay", help="replay file, e.g. last_replay.pkr")
+    parser.add_argument("--render", action="store_true", help="draw every tick (no frame limiter)")
+    args = parser.parse_args()
+
+    replay = Replay.load(args.replay)
+    game = replay.new_game()
+    if args.render:
+        import pygame
+        import main as game_window
+
+        game_window.init_display()
+        game_window.load_sprites()
+        game_window.game = game
+        game_window.previous_positions = game.entity_positions()
+
+        def draw_tick(played):
+            pygame.event.pump()
+            game_window.draw_game_scene(1.0)
+            pygame.display.flip()
+    else:
+        draw_tick = None
+
+    started = time.perf_counter()
+    game = play(replay, game, draw_tick)
+    elapsed = time.perf_counter() - started
+    print(
+        f"{replay.ticks} ticks ({replay.ticks / 60:.1f} s of play) in {elapsed:.3f} s: "
+        f"{game.status}, score {game.score}, level {game.level_number}, lives {game.lives}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""In-memory rewind.
+
+``RewindBuffer`` keeps the last stretch of a game in two preallocated rings:
+a snapshot (see snapshot.py) every ``keyframe_interval`` ticks and the one
+byte direction command of every tick in between. The engine is
+deterministic, so those commands are the whole difference from one tick to
+the next. Stepping back restores the keyframe at or before the wanted tick
+and steps the commands forward up to it.
+
+A minute at 60 Hz takes 3600 command bytes plus 61 keyframes of about 250
+bytes, under 20 KB. Recording costs one byte write per tick and a snapshot
+per keyframe. Nothing is allocated after the buffer is built.
+"""
+
+from array import array
+
+import snapshot
+
+
+class RewindBuffer:
+    # Call record(game, command) with the command of each tick right before
+    # game.step(command), and clear(game) after anything that is not a step
+    # (a new game, the next level, a quick load)
+    def __init__(self, game, seconds=60, tick_rate=60, keyframe_interval=60):
+        self.capacity = seconds * tick_rate
+        self.keyframe_interval = keyframe_interval
+        self.commands = bytearray(self.capacity)
+        self.keyframe_count = self.capacity // keyframe_interval + 1
+        self.keyframe_size = 0
+        self.keyframes = bytearray()
+        self.keyframe_ticks = array("q", [-1] * self.keyframe_count)
+        self.clear(game)
+
+    def clear(self, game):
+        keyframe = snapshot.take(game)
+        if len(keyframe) != self.keyframe_size:
+            # Only a board of another size changes it
+            self.keyframe_size = len(keyframe)
+            self.keyframes = bytearray(self.keyframe_size * self.keyframe_count)
+        for index in range(self.keyframe_count):
+            self.keyframe_ticks[index] = -1
+        self.start = game.ticks
+        self.end = game.ticks
+        # Latest tick ever recorded; stepping back does not lower it, since
+        # the ring slots of the ticks after the rewind point stay overwritten
+        self.high_water = game.ticks
+        self.store_keyframe(game.ticks, keyframe)
+
+    def store_keyframe(self, tick, keyframe):
+        slot = (tick - self.start) // self.keyframe_interval % self.keyframe_count
+        offset = slot * self.keyframe_size
+        self.keyframes[offset:offset + self.keyframe_size] = keyframe
+        self.keyframe_ticks[slot] = tick
+
+    def keyframe_at(self, tick):
+        # Snapshot bytes of the keyframe at or before tick, and its tick
+        tick = self.start + (tick - self.start) // self.keyframe_interval * self.keyframe_interval
+        slot = (tick - self.start) // self.keyframe_interval % self.keyframe_count
+        if self.keyframe_ticks[slot] != tick:
+            return None, tick
+        offset = slot * self.keyframe_size
+        return self.keyframes[offset:offset + self.keyframe_size], tick
+
+    def record(self, game, command):
+        tick = game.ticks
+        if tick != self.start and (tick - self.start) % self.keyframe_interval == 0:
+            self.store_keyframe(tick, snapshot.take(game))
+        self.commands[tick % self.capacity] = command
+        self.end = tick + 1
+        if self.end > self.high_water:
+            self.high_water = self.end
+
+    def oldest(self):
+        # First tick that can still be rewound to: the first keyframe whose
+        # commands up to the present are all still in the ring
+        since_start = max(0, self.high_water - self.capacity - self.start)
+        return self.start - (-since_start // self.keyframe_interval) * self.keyframe_interval
+
+    def seconds_held(self, tick_rate=60):
+        return (self.end - self.oldest()) / tick_rate
+
+    def step_back(self, game, ticks=1):
+        # Puts game back the given number of ticks; False once nothing is left
+        target = max(game.ticks - ticks, self.oldest())
+        if target >= game.ticks:
+            return False
+        keyframe, tick = self.keyframe_at(target)
+        if keyframe is None:
+            return False
+        snapshot.restore(game, keyframe)
+        commands = self.commands
+        capacity = self.capacity
+        for tick in range(tick, target):
+            game.step(commands[tick % capacity])
+        self.end = target
+        return True
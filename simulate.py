@@ -0,0 +1,176 @@
+"""Play many complete headless games on every core and report outcome percentiles.
+
+Examples:
+    python simulate.py --games 2000 --policy greedy
+    python simulate.py --games 2000 --policy greedy --powerup-frames 450 --json
+    python simulate.py --policy my_bots:CornerBot --records nightly.csv
+    python simulate.py --games 500 --start late_game.pks
+"""
+
+import argparse
+import concurrent.futures
+import csv
+import json
+import os
+import statistics
+import sys
+import time
+from collections import namedtuple
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import engine
+import policies
+import snapshot
+
+
+RESULT_TIMEOUT = "timeout"
+DEFAULT_MAX_TICKS = 60 * 60 * 15
+PERCENTILES = (5, 25, 50, 75, 95)
+
+GameRecord = namedtuple("GameRecord", "seed result score lives_lost ticks pellets_left ghosts_eaten")
+METRICS = ("score", "lives_lost", "ticks", "pellets_left", "ghosts_eaten")
+
+_worker_config = None
+
+
+def _init_worker(config):
+    global _worker_config
+    _worker_config = config
+
+
+def play_game(seed, config=None):
+    if config is None:
+        config = _worker_config
+    game = engine.Game(
+        powerup_frames=config["powerup_frames"],
+        ghost_speed=config["ghost_speed"],
+        frightened_speed=config["frightened_speed"],
+        dead_speed=config["dead_speed"],
+        ghost_ai=config["ghost_ai"],
+    )
+    if config["start"]:
+        snapshot.restore(game, snapshot.load(config["start"]))
+    policy = policies.load_policy(config["policy"])(seed)
+    max_ticks = config["max_ticks"]
+    while game.status == engine.STATUS_PLAYING and game.ticks < max_ticks:
+        if game.step(policy(game)) == engine.STATUS_WIN and game.has_next_level():
+            game.advance_level()
+    result = game.status if game.status != engine.STATUS_PLAYING else RESULT_TIMEOUT
+    return GameRecord(
+        seed,
+        result,
+        game.score,
+        engine.DEFAULT_LIVES - game.lives,
+        game.ticks,
+        game.count_pellets(),
+        game.ghosts_eaten,
+    )
+
+
+def run_games(config, seeds, workers):
+    # Records stream back in seed order as each chunk of games finishes
+    chunksize = max(1, len(seeds) // (workers * 8))
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(config,)
+    ) as executor:
+        yield from executor.map(play_game, seeds, chunksize=chunksize)
+
+
+def percentile_table(values):
+    values = sorted(values)
+    if len(values) == 1:
+        cuts = values * 99
+    else:
+        cuts = statistics.quantiles(values, n=100, method="inclusive")
+    row = {"min": values[0], "mean": statistics.fmean(values)}
+    for percent in PERCENTILES:
+        row[f"p{percent}"] = cuts[percent - 1]
+    row["max"] = values[-1]
+    return row
+
+
+def summarize(records):
+    results = {}
+    for record in records:
+        results[record.result] = results.get(record.result, 0) + 1
+    metrics = {name: percentile_table([getattr(record, name) for record in records]) for name in METRICS}
+    return {"games": len(records), "results": results, "metrics": metrics}
+
+
+def format_summary(summary, elapsed):
+    columns = list(next(iter(summary["metrics"].values())))
+    lines = [
+        f"{summary['games']} games in {elapsed:.1f}s "
+        + "  ".join(f"{result}: {count}" for result, count in sorted(summary["results"].items())),
+        f"{'metric':<14}" + "".join(f"{column:>10}" for column in columns),
+    ]
+    for name, row in summary["metrics"].items():
+        lines.append(f"{name:<14}" + "".join(f"{row[column]:>10.1f}" for column in columns))
+    return "\n".join(lines)
+
+
+def write_records(path, records):
+    with open(path, "w", newline="", encoding="utf-8") as records_file:
+        writer = csv.writer(records_file)
+        writer.writerow(GameRecord._fields)
+        writer.writerows(records)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=1000, help="number of complete games to play")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--policy", default="greedy", help=f"one of {sorted(policies.POLICIES)} or module:ClassName")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game; game i uses seed + i")
+    parser.add_argument("--max-ticks", type=int, default=DEFAULT_MAX_TICKS, help="end a game as a timeout after this many ticks")
+    # Left unset, each level uses its row of engine.LEVEL_SETTINGS
+    level_table = "default: per level, from engine.LEVEL_SETTINGS"
+    parser.add_argument("--powerup-frames", type=int, help=f"power pellet duration on every level ({level_table})")
+    parser.add_argument("--ghost-speed", type=int, help=f"ghost speed on every level ({level_table})")
+    parser.add_argument("--frightened-speed", type=int, help=f"frightened ghost speed on every level ({level_table})")
+    parser.add_argument("--dead-speed", type=int, help=f"eaten ghost speed on every level ({level_table})")
+    parser.add_argument("--ghost-ai", choices=engine.GHOST_AI_MODES, default=engine.GHOST_AI_CLASSIC)
+    parser.add_argument("--start", help="begin every game from this snapshot (its settings and ghost AI win)")
+    parser.add_argument("--records", help="also write one CSV row per game to this path")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    policies.load_policy(args.policy)
+    config = {
+        "policy": args.policy,
+        "max_ticks": args.max_ticks,
+        "powerup_frames": args.powerup_frames,
+        "ghost_speed": args.ghost_speed,
+        "frightened_speed": args.frightened_speed,
+        "dead_speed": args.dead_speed,
+        "ghost_ai": args.ghost_ai,
+        "start": args.start,
+    }
+    seeds = list(range(args.seed, args.seed + args.games))
+    workers = max(1, min(args.workers, args.games))
+
+    started = time.perf_counter()
+    records = []
+    for record in run_games(config, seeds, workers):
+        records.append(record)
+        if not args.json and len(records) % max(1, args.games // 10) == 0:
+            print(f"  {len(records)}/{args.games} games", file=sys.stderr)
+    elapsed = time.perf_counter() - started
+
+    if args.records:
+        write_records(args.records, records)
+    summary = summarize(records)
+    if args.json:
+        summary["config"] = config
+        summary["seconds"] = round(elapsed, 3)
+        print(json.dumps(summary, indent=2))
+    else:
+        print(format_summary(summary, elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""Game snapshots.
+
+A snapshot is the whole simulation state of a ``Game`` in one packed
+little-endian record, a couple of hundred bytes for the classic board:
+
+    magic "PKSN", version, hash of the board being played, ghost AI, the four
+    speed/powerup settings (0xFFFF = per-level table), level number, status,
+    score, lives, tick count, player and round state, ghost targets and speeds
+    x, y, direction, flags (dead, in box), speed and target of each ghost
+    one bit per tile, set where a pellet is left
+
+``restore`` writes one back into an existing Game and ``new_game`` builds a
+fresh one from it, so a benchmark or a bot can start from a mid-game position
+instead of replaying from tick 0. Stepping a restored game gives exactly the
+same states, and ``Game.state_hash`` values, as the game it was taken from.
+
+main.py keeps one quick save in ``quicksave.pks``. ``python snapshot.py FILE``
+describes a snapshot; with ``--replay REPLAY --tick N`` it first writes FILE
+from tick N of a recorded game.
+"""
+
+import argparse
+import os
+import struct
+import timeit
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import engine
+import replay
+
+
+MAGIC = b"PKSN"
+VERSION = 1
+HEADER = struct.Struct("<4sH10sB4HHBiBIBBHBBHBHhhBBB4B8h")
+GHOST = struct.Struct("<hhBBBhh")
+UNSET = 0xFFFF
+STATUSES = {code: status for status, code in engine.STATUS_CODES.items()}
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def pack_flags(values):
+    return sum(1 << index for index, value in enumerate(values) if value)
+
+
+def unpack_flags(flags, count):
+    return [bool(flags >> index & 1) for index in range(count)]
+
+
+def take(game):
+    # bytes of the current state of game
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        bytes.fromhex(game.layout.content_hash),
+        engine.GHOST_AI_MODES.index(game.ghost_ai),
+        *(UNSET if value is None else value for value in game.fixed_settings),
+        game.level_number,
+        engine.STATUS_CODES[game.status],
+        game.score,
+        game.lives,
+        game.ticks,
+        game.counter,
+        game.flicker,
+        game.startup_counter,
+        game.moving,
+        game.powerup,
+        game.power_counter,
+        game.score_pop_timer,
+        game.ghosts_eaten,
+        game.player_x,
+        game.player_y,
+        game.direction,
+        game.direction_command,
+        pack_flags(game.eaten_ghost + game.turns_allowed),
+        *game.ghost_speeds,
+        *(value for target in game.targets for value in target),
+    )
+    ghosts = b"".join(
+        GHOST.pack(ghost.x_pos, ghost.y_pos, ghost.direction, ghost.dead | ghost.in_box << 1, ghost.speed, *ghost.target)
+        for ghost in game.ghosts
+    )
+    return header + ghosts + game.pellets.to_bits()
+
+
+def restore(game, data):
+    # Puts game in the state data was taken in. The board must be one of
+    # game.layouts; its compiled tables are reused when it is already loaded.
+    if len(data) < HEADER.size + GHOST.size * 4:
+        raise SnapshotError("snapshot too short")
+    fields = HEADER.unpack_from(data)
+    if fields[0] != MAGIC:
+        raise SnapshotError("not a snapshot file")
+    if fields[1] != VERSION:
+        raise SnapshotError(f"unsupported snapshot version {fields[1]}")
+    board_hash = fields[2].hex()
+    layout = next((layout for layout in game.layouts if layout.content_hash == board_hash), None)
+    if layout is None:
+        raise SnapshotError(f"snapshot was taken on board {board_hash}, which this game does not play")
+    bits = data[HEADER.size + GHOST.size * 4:]
+    if len(bits) != (layout.rows * layout.cols + 7) // 8:
+        raise SnapshotError("snapshot pellet bitset does not match its board")
+    if fields[3] >= len(engine.GHOST_AI_MODES) or fields[9] not in STATUSES:
+        raise SnapshotError("snapshot holds an unknown ghost AI or status")
+    # Nothing in game has changed up to here
+    ghost_ai = engine.GHOST_AI_MODES[fields[3]]
+    if game.layout is not layout or game.ghost_ai != ghost_ai or game.level_number != fields[8]:
+        # The next level compiled in the background is only kept for the
+        # same level, so rewinding within a level keeps it
+        game.preloaded = None
+    if game.layout is not layout or game.ghost_ai != ghost_ai:
+        game.ghost_ai = ghost_ai
+        game.use_level(engine.CompiledLevel(layout, ghost_ai))
+    game.pellets.load_bits(bits)
+
+    game.fixed_settings = tuple(None if value == UNSET else value for value in fields[4:8])
+    game.level_number = fields[8]
+    game.apply_level_settings()
+    game.status = STATUSES[fields[9]]
+    (game.score, game.lives, game.ticks, game.counter, game.flicker, game.startup_counter, game.moving,
+     game.powerup, game.power_counter, game.score_pop_timer, game.ghosts_eaten, game.player_x, game.player_y,
+     game.direction, game.direction_command) = fields[10:25]
+    game.flicker = bool(game.flicker)
+    game.moving = bool(game.moving)
+    game.powerup = bool(game.powerup)
+    flags = unpack_flags(fields[25], 8)
+    game.eaten_ghost = flags[:4]
+    game.turns_allowed = flags[4:]
+    game.ghost_speeds = list(fields[26:30])
+    game.targets = [tuple(fields[30 + index * 2:32 + index * 2]) for index in range(4)]
+    for index, ghost in enumerate(game.ghosts):
+        x_pos, y_pos, direction, ghost_flags, speed, *target = GHOST.unpack_from(data, HEADER.size + index * GHOST.size)
+        ghost.set_state((x_pos, y_pos, direction, bool(ghost_flags & 1), tuple(target), speed))
+        ghost.in_box = bool(ghost_flags & 2)
+    return game
+
+
+def new_game(data, layouts=None):
+    # A Game in the state of the snapshot
+    return restore(engine.Game(layouts=layouts), data)
+
+
+def save(game, path):
+    with open(path, "wb") as snapshot_file:
+        snapshot_file.write(take(game))
+
+
+def load(path):
+    with open(path, "rb") as snapshot_file:
+        return snapshot_file.read()
+
+
+def from_replay(recording, tick):
+    # A Game at the given tick of a replay
+    game = recording.new_game()
+    replay.play(recording, game, lambda played: played.ticks >= tick)
+    return game
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Describe a game snapshot, or take one from a replay.")
+    parser.add_argument("snapshot", help="snapshot file, e.g. quicksave.pks")
+    parser.add_argument("--replay", help="write the snapshot from this replay first")
+    parser.add_argument("--tick", type=int, default=0, help="replay tick to snapshot (default: the end)")
+    args = parser.parse_args()
+
+    if args.replay:
+        recording = replay.Replay.load(args.replay)
+        save(from_replay(recording, args.tick or recording.ticks), args.snapshot)
+    data = load(args.snapshot)
+    game = new_game(data)
+    runs = 10000
+    take_us = timeit.timeit(lambda: take(game), number=runs) / runs * 1e6
+    restore_us = timeit.timeit(lambda: restore(game, data), number=runs) / runs * 1e6
+    print(
+        f"{args.snapshot}: {len(data)} bytes, tick {game.ticks}, {game.status}, level {game.level_number}, "
+        f"score {game.score}, lives {game.lives}, {game.pellets.remaining} pellets left"
+    )
+    print(f"take {take_us:.1f} us, restore {restore_us:.1f} us, state hash {game.state_hash():08x}")
+
+
+if __name__ == "__main__":
+    main()
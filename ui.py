@@ -1,3 +1,5 @@
+from collections import OrderedDict
+
 import pygame
 
 
@@ -9,6 +11,14 @@ BUTTON_HEIGHT = 54
 BUTTON_GAP = 12
 HUD_HEIGHT = 50
 
+# Text rendering
+TEXT_CACHE_SIZE = 256
+# Fully drawn panels kept, by content; a menu with every hover/selection
+# state of its buttons fits several times over
+PANEL_CACHE_SIZE = 48
+# Score pop scale for each remaining score_pop_timer value
+POP_SCALES = tuple(1.0 + min(0.22, timer * 0.02) if timer > 0 else 1.0 for timer in range(13))
+
 # Palette
 COLOR_BG_TOP = (8, 14, 36)
 COLOR_BG_BOTTOM = (2, 6, 16)
@@ -24,6 +34,14 @@ COLOR_HUD_BG = (10, 16, 34)
 COLOR_WIN = (110, 226, 154)
 COLOR_LOSE = (255, 112, 120)
 
+_gradient_cache = {}
+_text_cache = OrderedDict()
+_glyph_atlases = {}
+_hud_cache = {"key": None, "surface": None}
+_overlay_pool = {}
+_panel_cache = {}
+_composed_panels = OrderedDict()
+
 
 def create_fonts():
     return {
@@ -34,30 +52,154 @@ def create_fonts():
     }
 
 
-def draw_gradient_background(surface, width, height):
-    for y_pos in range(height):
-        blend = y_pos / max(1, height - 1)
-        red = int(COLOR_BG_TOP[0] + (COLOR_BG_BOTTOM[0] - COLOR_BG_TOP[0]) * blend)
-        green = int(COLOR_BG_TOP[1] + (COLOR_BG_BOTTOM[1] - COLOR_BG_TOP[1]) * blend)
-        blue = int(COLOR_BG_TOP[2] + (COLOR_BG_BOTTOM[2] - COLOR_BG_TOP[2]) * blend)
-        pygame.draw.line(surface, (red, green, blue), (0, y_pos), (width, y_pos))
+def gradient_surface(width, height, top_color, bottom_color):
+    # Rendered once per (size, colors); a resize or theme change replaces it
+    key = (width, height, tuple(top_color), tuple(bottom_color))
+    gradient = _gradient_cache.get(key)
+    if gradient is None:
+        gradient = pygame.Surface((width, height))
+        for y_pos in range(height):
+            blend = y_pos / max(1, height - 1)
+            red = int(top_color[0] + (bottom_color[0] - top_color[0]) * blend)
+            green = int(top_color[1] + (bottom_color[1] - top_color[1]) * blend)
+            blue = int(top_color[2] + (bottom_color[2] - top_color[2]) * blend)
+            pygame.draw.line(gradient, (red, green, blue), (0, y_pos), (width, y_pos))
+        _gradient_cache.clear()
+        _gradient_cache[key] = gradient
+    return gradient
+
+
+def render_text(font, text, color):
+    # font.render results, least recently used evicted first
+    key = (font, text, color)
+    text_surface = _text_cache.get(key)
+    if text_surface is None:
+        text_surface = font.render(text, True, color)
+        _text_cache[key] = text_surface
+        if len(_text_cache) > TEXT_CACHE_SIZE:
+            _text_cache.popitem(last=False)
+    else:
+        _text_cache.move_to_end(key)
+    return text_surface
+
+
+class GlyphAtlas:
+    # Labels and single characters of one font and color, rendered once per
+    # scale, so numeric fields are composed from cached pieces.
+    def __init__(self, font, color):
+        self.font = font
+        self.color = color
+        self.pieces = {}
+        # label -> (value, scale, surface) of the last field composed for it
+        self.fields = {}
+
+    def piece(self, text, scale=1.0):
+        pieces = self.pieces.setdefault(scale, {})
+        piece_surface = pieces.get(text)
+        if piece_surface is None:
+            if scale == 1.0:
+                piece_surface = self.font.render(text, True, self.color)
+            else:
+                base = self.piece(text)
+                piece_surface = pygame.transform.smoothscale(
+                    base, (int(base.get_width() * scale), int(base.get_height() * scale))
+                )
+            pieces[text] = piece_surface
+        return piece_surface
+
+    def render_field(self, label, value, scale=1.0):
+        # Pieces sit where the font would lay out the whole string
+        last = self.fields.get(label)
+        if last is not None and last[0] == value and last[1] == scale:
+            return last[2]
+        text = label + str(value)
+        width, height = self.font.size(text)
+        field = pygame.Surface((int(width * scale), int(height * scale)), pygame.SRCALPHA)
+        field.blit(self.piece(label, scale), (0, 0))
+        for index in range(len(label), len(text)):
+            x_pos = int(self.font.size(text[:index])[0] * scale)
+            field.blit(self.piece(text[index], scale), (x_pos, 0))
+        self.fields[label] = (value, scale, field)
+        return field
+
+
+def get_glyph_atlas(font, color):
+    atlas = _glyph_atlases.get((font, color))
+    if atlas is None:
+        atlas = _glyph_atlases[(font, color)] = GlyphAtlas(font, color)
+    return atlas
 
 
-def draw_panel(surface, rect, alpha=230):
+def draw_gradient_background(surface, width, height):
+    surface.blit(gradient_surface(width, height, COLOR_BG_TOP, COLOR_BG_BOTTOM), (0, 0))
+
+
+def get_overlay(size, color, alpha):
+    # One solid surface per (size, color), reused with a new surface alpha
+    key = (tuple(size), tuple(color))
+    overlay = _overlay_pool.get(key)
+    if overlay is None:
+        overlay = pygame.Surface(size)
+        if pygame.display.get_surface() is not None:
+            overlay = overlay.convert()
+        overlay.fill(color)
+        _overlay_pool[key] = overlay
+    overlay.set_alpha(alpha)
+    return overlay
+
+
+def draw_dim(surface, alpha, color=(0, 0, 0)):
+    surface.blit(get_overlay(surface.get_size(), color, max(0, min(255, int(alpha)))), (0, 0))
+
+
+def get_panel_surface(size, alpha):
+    key = (tuple(size), alpha)
+    panel = _panel_cache.get(key)
+    if panel is None:
+        panel = pygame.Surface(size, pygame.SRCALPHA)
+        panel.fill((*COLOR_PANEL, alpha))
+        pygame.draw.rect(panel, (*COLOR_PANEL, alpha), panel.get_rect(), border_radius=PANEL_RADIUS)
+        pygame.draw.rect(panel, COLOR_PANEL_BORDER, panel.get_rect(), 2, border_radius=PANEL_RADIUS)
+        if pygame.display.get_surface() is not None:
+            panel = panel.convert_alpha()
+        _panel_cache[key] = panel
+    return panel
+
+
+def fonts_key(fonts):
+    # The font objects themselves: a cache entry keeps them alive, so fonts
+    # built again later can never match it the way a reused id() could
+    return tuple(fonts.values())
+
+
+def get_composed_panel(size, alpha, key, compose):
+    # The panel with compose(panel) drawn on it, done once per content key
+    full_key = (tuple(size), alpha, key)
+    panel = _composed_panels.get(full_key)
+    if panel is None:
+        panel = get_panel_surface(size, alpha).copy()
+        compose(panel)
+        _composed_panels[full_key] = panel
+        if len(_composed_panels) > PANEL_CACHE_SIZE:
+            _composed_panels.popitem(last=False)
+    else:
+        _composed_panels.move_to_end(full_key)
+    return panel
+
+
+def draw_panel(surface, rect, alpha=230, key=None, compose=None):
+    # compose(panel), if given, draws the contents in panel coordinates; key
+    # must change whenever they would look different
     shadow_rect = rect.move(0, 8)
-    shadow = pygame.Surface(shadow_rect.size, pygame.SRCALPHA)
-    shadow.fill((0, 0, 0, 80))
-    surface.blit(shadow, shadow_rect.topleft)
-
-    panel = pygame.Surface(rect.size, pygame.SRCALPHA)
-    panel.fill((*COLOR_PANEL, alpha))
-    pygame.draw.rect(panel, (*COLOR_PANEL, alpha), panel.get_rect(), border_radius=PANEL_RADIUS)
-    pygame.draw.rect(panel, COLOR_PANEL_BORDER, panel.get_rect(), 2, border_radius=PANEL_RADIUS)
-    surface.blit(panel, rect.topleft)
+    surface.blit(get_overlay(shadow_rect.size, (0, 0, 0), 80), shadow_rect.topleft)
+    if compose is None:
+        surface.blit(get_panel_surface(rect.size, alpha), rect.topleft)
+    else:
+        surface.blit(get_composed_panel(rect.size, alpha, key, compose), rect.topleft)
 
 
 def draw_centered_text(surface, font, text, color, center):
-    text_surface = font.render(text, True, color)
+    text_surface = render_text(font, text, color)
     text_rect = text_surface.get_rect(center=center)
     surface.blit(text_surface, text_rect)
     return text_rect
@@ -76,6 +218,32 @@ def _draw_button(surface, font, text, rect, selected, hovered, pressed):
     draw_centered_text(surface, font, text, COLOR_TEXT, rect.center)
 
 
+def layout_buttons(panel_rect, top, count):
+    return [
+        pygame.Rect(
+            panel_rect.left + PANEL_PADDING,
+            panel_rect.top + top + index * (BUTTON_HEIGHT + BUTTON_GAP),
+            panel_rect.width - PANEL_PADDING * 2,
+            BUTTON_HEIGHT,
+        )
+        for index in range(count)
+    ]
+
+
+def button_states(button_rects, selected_index, mouse_pos, mouse_down):
+    # (selected, hovered, pressed) of each button, part of the panel key
+    states = []
+    for index, button_rect in enumerate(button_rects):
+        hovered = bool(button_rect.collidepoint(mouse_pos))
+        states.append((index == selected_index, hovered, bool(mouse_down) and hovered))
+    return tuple(states)
+
+
+def draw_buttons(panel, font, options, button_rects, states, offset):
+    for option, button_rect, (selected, hovered, pressed) in zip(options, button_rects, states):
+        _draw_button(panel, font, option, button_rect.move(offset), selected, hovered, pressed)
+
+
 def draw_menu(surface, fonts, title, subtitle, options, selected_index, mouse_pos, mouse_down):
     panel_height = 190 + len(options) * (BUTTON_HEIGHT + BUTTON_GAP)
     panel_rect = pygame.Rect(
@@ -84,25 +252,18 @@ def draw_menu(surface, fonts, title, subtitle, options, selected_index, mouse_po
         PANEL_WIDTH,
         panel_height,
     )
-    draw_panel(surface, panel_rect)
-
-    title_y = panel_rect.top + PANEL_PADDING + 20
-    draw_centered_text(surface, fonts["title"], title, COLOR_TEXT, (panel_rect.centerx, title_y))
-    draw_centered_text(surface, fonts["small"], subtitle, COLOR_TEXT_DIM, (panel_rect.centerx, title_y + 34))
-
-    button_rects = []
-    buttons_top = panel_rect.top + 110
-    for index, option in enumerate(options):
-        button_rect = pygame.Rect(
-            panel_rect.left + PANEL_PADDING,
-            buttons_top + index * (BUTTON_HEIGHT + BUTTON_GAP),
-            panel_rect.width - PANEL_PADDING * 2,
-            BUTTON_HEIGHT,
-        )
-        hovered = button_rect.collidepoint(mouse_pos)
-        selected = index == selected_index
-        _draw_button(surface, fonts["body"], option, button_rect, selected, hovered, mouse_down)
-        button_rects.append(button_rect)
+    button_rects = layout_buttons(panel_rect, 110, len(options))
+    states = button_states(button_rects, selected_index, mouse_pos, mouse_down)
+    offset = (-panel_rect.left, -panel_rect.top)
+
+    def compose(panel):
+        title_y = PANEL_PADDING + 20
+        draw_centered_text(panel, fonts["title"], title, COLOR_TEXT, (panel_rect.width // 2, title_y))
+        draw_centered_text(panel, fonts["small"], subtitle, COLOR_TEXT_DIM, (panel_rect.width // 2, title_y + 34))
+        draw_buttons(panel, fonts["body"], options, button_rects, states, offset)
+
+    key = ("menu", fonts_key(fonts), title, subtitle, tuple(options), states)
+    draw_panel(surface, panel_rect, key=key, compose=compose)
     return button_rects
 
 
@@ -112,79 +273,80 @@ def draw_controls_screen(surface, fonts, selected_index, mouse_pos, mouse_down,
         f"SFX: {'On' if sfx_on else 'Off'}",
         "Back",
     ]
-    panel_height = 440
+    control_lines = [
+        "Arrow Keys: Move",
+        "P or Esc: Pause/Resume",
+        "F: Toggle FPS Counter",
+        "R: Restart (pause/end screens)",
+        "S / L: Quick Save / Quick Load (pause screen)",
+        "Backspace (hold): Rewind",
+    ]
+    # The buttons start below the last control line
+    buttons_top = 104 + len(control_lines) * 24
+    panel_height = buttons_top + 240
     panel_rect = pygame.Rect(
         (surface.get_width() - PANEL_WIDTH) // 2,
         (surface.get_height() - panel_height) // 2,
         PANEL_WIDTH,
         panel_height,
     )
-    draw_panel(surface, panel_rect)
+    button_rects = layout_buttons(panel_rect, buttons_top, len(options))
+    states = button_states(button_rects, selected_index, mouse_pos, mouse_down)
+    offset = (-panel_rect.left, -panel_rect.top)
+
+    def compose(panel):
+        center_x = panel_rect.width // 2
+        draw_centered_text(panel, fonts["heading"], "Controls & Settings", COLOR_TEXT, (center_x, 42))
+        line_y = 84
+        for line in control_lines:
+            draw_centered_text(panel, fonts["small"], line, COLOR_TEXT_DIM, (center_x, line_y))
+            line_y += 24
+        draw_buttons(panel, fonts["body"], options, button_rects, states, offset)
+        footer = "Use arrows + Enter or mouse click"
+        draw_centered_text(panel, fonts["small"], footer, COLOR_TEXT_DIM, (center_x, panel_rect.height - 22))
+
+    key = ("controls", fonts_key(fonts), tuple(options), states)
+    draw_panel(surface, panel_rect, key=key, compose=compose)
+    return button_rects
 
-    draw_centered_text(surface, fonts["heading"], "Controls & Settings", COLOR_TEXT, (panel_rect.centerx, panel_rect.top + 42))
-    control_lines = [
-        "Arrow Keys: Move",
-        "P or Esc: Pause/Resume",
-        "F: Toggle FPS Counter",
-        "R: Restart (pause/end screens)",
-    ]
-    line_y = panel_rect.top + 84
-    for line in control_lines:
-        draw_centered_text(surface, fonts["small"], line, COLOR_TEXT_DIM, (panel_rect.centerx, line_y))
-        line_y += 24
-
-    button_rects = []
-    buttons_top = panel_rect.top + 200
-    for index, option in enumerate(options):
-        button_rect = pygame.Rect(
-            panel_rect.left + PANEL_PADDING,
-            buttons_top + index * (BUTTON_HEIGHT + BUTTON_GAP),
-            panel_rect.width - PANEL_PADDING * 2,
-            BUTTON_HEIGHT,
-        )
-        hovered = button_rect.collidepoint(mouse_pos)
-        selected = index == selected_index
-        _draw_button(surface, fonts["body"], option, button_rect, selected, hovered, mouse_down)
-        button_rects.append(button_rect)
 
-    footer = "Use arrows + Enter or mouse click"
-    draw_centered_text(surface, fonts["small"], footer, COLOR_TEXT_DIM, (panel_rect.centerx, panel_rect.bottom - 22))
-    return button_rects
+def get_hud_rect(surface):
+    return pygame.Rect(0, surface.get_height() - HUD_HEIGHT, surface.get_width(), HUD_HEIGHT)
 
 
-def draw_hud(surface, fonts, score, high_score, lives, level_number, show_fps, fps_value, score_pop_timer):
-    hud_rect = pygame.Rect(0, surface.get_height() - HUD_HEIGHT, surface.get_width(), HUD_HEIGHT)
-    pygame.draw.rect(surface, COLOR_HUD_BG, hud_rect)
-    pygame.draw.line(surface, COLOR_PANEL_BORDER, (0, hud_rect.top), (hud_rect.right, hud_rect.top), 2)
-
-    score_scale = 1.0
-    if score_pop_timer > 0:
-        score_scale = 1.0 + min(0.22, score_pop_timer * 0.02)
-    score_surface = fonts["body"].render(f"Score: {score}", True, COLOR_ACCENT)
-    if score_scale != 1.0:
-        score_surface = pygame.transform.smoothscale(
-            score_surface,
-            (int(score_surface.get_width() * score_scale), int(score_surface.get_height() * score_scale)),
-        )
-    score_rect = score_surface.get_rect(midleft=(18, hud_rect.centery))
-    surface.blit(score_surface, score_rect)
+def render_hud(hud, fonts, score, high_score, lives, level_number, fps_text, score_scale):
+    hud_rect = hud.get_rect()
+    hud.fill(COLOR_HUD_BG)
+    pygame.draw.line(hud, COLOR_PANEL_BORDER, (0, 0), (hud_rect.right, 0), 2)
 
-    high_surface = fonts["small"].render(f"High Score: {high_score}", True, COLOR_TEXT)
-    high_rect = high_surface.get_rect(midleft=(250, hud_rect.centery))
-    surface.blit(high_surface, high_rect)
+    score_surface = get_glyph_atlas(fonts["body"], COLOR_ACCENT).render_field("Score: ", score, score_scale)
+    hud.blit(score_surface, score_surface.get_rect(midleft=(18, hud_rect.centery)))
 
-    lives_surface = fonts["small"].render(f"Lives: {lives}", True, COLOR_TEXT)
-    lives_rect = lives_surface.get_rect(midleft=(470, hud_rect.centery))
-    surface.blit(lives_surface, lives_rect)
+    small = get_glyph_atlas(fonts["small"], COLOR_TEXT)
+    high_surface = small.render_field("High Score: ", high_score)
+    hud.blit(high_surface, high_surface.get_rect(midleft=(250, hud_rect.centery)))
+    lives_surface = small.render_field("Lives: ", lives)
+    hud.blit(lives_surface, lives_surface.get_rect(midleft=(470, hud_rect.centery)))
+    level_surface = small.render_field("Level: ", level_number)
+    hud.blit(level_surface, level_surface.get_rect(midleft=(620, hud_rect.centery)))
 
-    level_surface = fonts["small"].render(f"Level: {level_number}", True, COLOR_TEXT)
-    level_rect = level_surface.get_rect(midleft=(620, hud_rect.centery))
-    surface.blit(level_surface, level_rect)
+    if fps_text is not None:
+        fps_surface = get_glyph_atlas(fonts["small"], COLOR_TEXT_DIM).render_field("FPS: ", fps_text)
+        hud.blit(fps_surface, fps_surface.get_rect(midright=(hud_rect.width - 18, hud_rect.centery)))
 
-    if show_fps:
-        fps_surface = fonts["small"].render(f"FPS: {fps_value:.0f}", True, COLOR_TEXT_DIM)
-        fps_rect = fps_surface.get_rect(midright=(surface.get_width() - 18, hud_rect.centery))
-        surface.blit(fps_surface, fps_rect)
+
+def draw_hud(surface, fonts, score, high_score, lives, level_number, show_fps, fps_value, score_pop_timer):
+    # The strip is rendered again only when one of its values changes
+    hud_rect = get_hud_rect(surface)
+    fps_text = f"{fps_value:.0f}" if show_fps else None
+    score_scale = POP_SCALES[min(max(score_pop_timer, 0), len(POP_SCALES) - 1)]
+    key = (hud_rect.size, fonts_key(fonts), score, high_score, lives, level_number, fps_text, score_scale)
+    if _hud_cache["key"] != key:
+        if _hud_cache["surface"] is None or _hud_cache["surface"].get_size() != hud_rect.size:
+            _hud_cache["surface"] = pygame.Surface(hud_rect.size)
+        render_hud(_hud_cache["surface"], fonts, score, high_score, lives, level_number, fps_text, score_scale)
+        _hud_cache["key"] = key
+    surface.blit(_hud_cache["surface"], hud_rect)
 
 
 def draw_end_screen(surface, fonts, is_win, score, high_score):
@@ -195,31 +357,19 @@ def draw_end_screen(surface, fonts, is_win, score, high_score):
         PANEL_WIDTH,
         panel_height,
     )
-    draw_panel(surface, panel_rect)
-
-    title = "You Win!" if is_win else "Game Over"
-    title_color = COLOR_WIN if is_win else COLOR_LOSE
-    draw_centered_text(surface, fonts["title"], title, title_color, (panel_rect.centerx, panel_rect.top + 58))
-
-    draw_centered_text(
-        surface,
-        fonts["body"],
-        f"Score: {score}   High Score: {high_score}",
-        COLOR_TEXT,
-        (panel_rect.centerx, panel_rect.top + 118),
-    )
-    draw_centered_text(
-        surface,
-        fonts["small"],
-        "Press R to restart / Esc to quit",
-        COLOR_TEXT_DIM,
-        (panel_rect.centerx, panel_rect.top + 170),
-    )
+
+    def compose(panel):
+        center_x = panel_rect.width // 2
+        title = "You Win!" if is_win else "Game Over"
+        title_color = COLOR_WIN if is_win else COLOR_LOSE
+        draw_centered_text(panel, fonts["title"], title, title_color, (center_x, 58))
+        draw_centered_text(panel, fonts["body"], f"Score: {score}   High Score: {high_score}", COLOR_TEXT, (center_x, 118))
+        draw_centered_text(panel, fonts["small"], "Press R to restart / Esc to quit", COLOR_TEXT_DIM, (center_x, 170))
+
+    draw_panel(surface, panel_rect, key=("end", fonts_key(fonts), is_win, score, high_score), compose=compose)
 
 
 def draw_fade_overlay(surface, alpha):
     if alpha <= 0:
         return
-    overlay = pygame.Surface(surface.get_size(), pygame.SRCALPHA)
-    overlay.fill((0, 0, 0, max(0, min(255, int(alpha)))))
-    surface.blit(overlay, (0, 0))
+    draw_dim(surface, alpha)
@@ -0,0 +1,237 @@
+"""Precomputed turn permissions for every entity center pixel on a board.
+
+``check_position`` and ``Ghost.check_collisions`` only depend on a handful of
+derived values of the center pixel: its tile, the tiles 15 px to either side
+and whether it sits inside the 12-18 px turning window. Pixels that agree on
+all of those behave identically, so each axis collapses to a few hundred
+pixel classes. The tables hold the result for every (row class, column
+class, direction) of a board, computed once on first visit; a movement check
+is then one indexed read of a ``(right, left, up, down)`` tuple.
+
+Pellets never change walls (every tile below 3 is walkable), so the tables stay
+valid for the whole level.
+"""
+
+import levels
+from levels import TILE_HEIGHT, TILE_WIDTH
+
+
+FUDGE = 15
+MIN_CENTER_X = -64
+MAX_CENTER_X = 992
+
+# Every possible (right, left, up, down) result and its bit mask
+TURNS = tuple(tuple(bool(mask & (1 << bit)) for bit in range(4)) for mask in range(16))
+TURN_MASK = {turns: mask for mask, turns in enumerate(TURNS)}
+# Bump when the turn rules or to_bytes() change, so cached tables are rebuilt
+WALK_CACHE_VERSION = 1
+
+_cache = {}
+
+
+def player_turns_at(level, centerx, centery, direction):
+    # Reference rules the tables are compiled from (formerly check_position)
+    turns = [False, False, False, False]
+    num1 = TILE_HEIGHT
+    num2 = TILE_WIDTH
+    num3 = FUDGE
+    # check collisions based on center x and center y of player +/- fudge number
+    if centerx // num2 < levels.BOARD_COLS - 1:
+        if direction == 0:
+            if level[centery // num1][(centerx - num3) // num2] < 3:
+                turns[1] = True
+        if direction == 1:
+            if level[centery // num1][(centerx + num3) // num2] < 3:
+                turns[0] = True
+        if direction == 2:
+            if level[(centery + num3) // num1][centerx // num2] < 3:
+                turns[3] = True
+        if direction == 3:
+            if level[(centery - num3) // num1][centerx // num2] < 3:
+                turns[2] = True
+
+        if direction == 2 or direction == 3:
+            if 12 <= centerx % num2 <= 18:
+                if level[(centery + num3) // num1][centerx // num2] < 3:
+                    turns[3] = True
+                if level[(centery - num3) // num1][centerx // num2] < 3:
+                    turns[2] = True
+            if 12 <= centery % num1 <= 18:
+                if level[centery // num1][(centerx - num2) // num2] < 3:
+                    turns[1] = True
+                if level[centery // num1][(centerx + num2) // num2] < 3:
+                    turns[0] = True
+        if direction == 0 or direction == 1:
+            if 12 <= centerx % num2 <= 18:
+                if level[(centery + num1) // num1][centerx // num2] < 3:
+                    turns[3] = True
+                if level[(centery - num1) // num1][centerx // num2] < 3:
+                    turns[2] = True
+            if 12 <= centery % num1 <= 18:
+                if level[centery // num1][(centerx - num3) // num2] < 3:
+                    turns[1] = True
+                if level[centery // num1][(centerx + num3) // num2] < 3:
+                    turns[0] = True
+    else:
+        turns[0] = True
+        turns[1] = True
+    return tuple(turns)
+
+
+def ghost_turns_at(level, center_x, center_y, direction, gate_open):
+    # Reference rules the tables are compiled from (formerly the body of
+    # Ghost.check_collisions); gate_open is the ghost's "in_box or dead".
+    num1 = TILE_HEIGHT
+    num2 = TILE_WIDTH
+    num3 = FUDGE
+    turns = [False, False, False, False]
+
+    def passable(tile):
+        return tile < 3 or (tile == 9 and gate_open)
+
+    if 0 < center_x // num2 < levels.BOARD_COLS - 1:
+        if level[(center_y - num3) // num1][center_x // num2] == 9:
+            turns[2] = True
+        if passable(level[center_y // num1][(center_x - num3) // num2]):
+            turns[1] = True
+        if passable(level[center_y // num1][(center_x + num3) // num2]):
+            turns[0] = True
+        if passable(level[(center_y + num3) // num1][center_x // num2]):
+            turns[3] = True
+        if passable(level[(center_y - num3) // num1][center_x // num2]):
+            turns[2] = True
+
+        if direction == 2 or direction == 3:
+            if 12 <= center_x % num2 <= 18:
+                if passable(level[(center_y + num3) // num1][center_x // num2]):
+                    turns[3] = True
+                if passable(level[(center_y - num3) // num1][center_x // num2]):
+                    turns[2] = True
+            if 12 <= center_y % num1 <= 18:
+                if passable(level[center_y // num1][(center_x - num2) // num2]):
+                    turns[1] = True
+                if passable(level[center_y // num1][(center_x + num2) // num2]):
+                    turns[0] = True
+
+        if direction == 0 or direction == 1:
+            if 12 <= center_x % num2 <= 18:
+                if passable(level[(center_y + num3) // num1][center_x // num2]):
+                    turns[3] = True
+                if passable(level[(center_y - num3) // num1][center_x // num2]):
+                    turns[2] = True
+            if 12 <= center_y % num1 <= 18:
+                if passable(level[center_y // num1][(center_x - num3) // num2]):
+                    turns[1] = True
+                if passable(level[center_y // num1][(center_x + num3) // num2]):
+                    turns[0] = True
+    else:
+        turns[0] = True
+        turns[1] = True
+    return tuple(turns)
+
+
+def _pixel_classes(start, stop, tile_size):
+    # Returns (representative pixel per class, class index per pixel)
+    representatives = []
+    class_of = []
+    seen = {}
+    for pixel in range(start, stop):
+        key = (
+            pixel // tile_size,
+            (pixel - FUDGE) // tile_size,
+            (pixel + FUDGE) // tile_size,
+            12 <= pixel % tile_size <= 18,
+        )
+        if key not in seen:
+            seen[key] = len(representatives)
+            representatives.append(pixel)
+        class_of.append(seen[key])
+    return representatives, class_of
+
+
+class WalkTables:
+    def __init__(self, level):
+        self.level = level
+        # The lowest row is never reached; stopping one tile short of the
+        # bottom keeps every "row + 1" read inside the board.
+        self.max_center_y = (len(level) - 1) * TILE_HEIGHT
+        self.x_pixels, x_class = _pixel_classes(MIN_CENTER_X, MAX_CENTER_X, TILE_WIDTH)
+        self.y_pixels, y_class = _pixel_classes(0, self.max_center_y, TILE_HEIGHT)
+
+        # Flat index = y_offsets[y] + x_offsets[x - MIN_CENTER_X] + direction
+        self.x_offsets = [index * 4 for index in x_class]
+        self.y_offsets = [index * len(self.x_pixels) * 4 for index in y_class]
+
+        # Entries are filled the first time an entity visits that pixel class;
+        # fill() computes all of them up front.
+        size = len(self.x_pixels) * len(self.y_pixels) * 4
+        self.player = [None] * size
+        self.ghost = [None] * size
+        self.ghost_gate = [None] * size
+
+    def fill(self):
+        for center_y in self.y_pixels:
+            for center_x in self.x_pixels:
+                for direction in range(4):
+                    self.player_turns(center_x, center_y, direction)
+                    self.ghost_turns(center_x, center_y, direction, False)
+                    self.ghost_turns(center_x, center_y, direction, True)
+        return self
+
+    def to_bytes(self):
+        # One byte per entry (bit 0 right .. bit 3 down), player then ghost tables
+        self.fill()
+        return b"".join(bytes(map(TURN_MASK.__getitem__, table)) for table in (self.player, self.ghost, self.ghost_gate))
+
+    @classmethod
+    def from_bytes(cls, level, data):
+        # Tables saved by to_bytes, or None if data is missing or from another layout
+        if data is None:
+            return None
+        tables = cls(level)
+        size = len(tables.player)
+        if len(data) != size * 3:
+            return None
+        tables.player = list(map(TURNS.__getitem__, data[:size]))
+        tables.ghost = list(map(TURNS.__getitem__, data[size:size * 2]))
+        tables.ghost_gate = list(map(TURNS.__getitem__, data[size * 2:]))
+        return tables
+
+    def player_turns(self, center_x, center_y, direction):
+        if MIN_CENTER_X <= center_x < MAX_CENTER_X and 0 <= center_y < self.max_center_y:
+            index = self.y_offsets[center_y] + self.x_offsets[center_x - MIN_CENTER_X] + direction
+            turns = self.player[index]
+            if turns is None:
+                turns = self.player[index] = player_turns_at(self.level, center_x, center_y, direction)
+            return turns
+        return player_turns_at(self.level, center_x, center_y, direction)
+
+    def ghost_turns(self, center_x, center_y, direction, gate_open):
+        if MIN_CENTER_X <= center_x < MAX_CENTER_X and 0 <= center_y < self.max_center_y:
+            table = self.ghost_gate if gate_open else self.ghost
+            index = self.y_offsets[center_y] + self.x_offsets[center_x - MIN_CENTER_X] + direction
+            turns = table[index]
+            if turns is None:
+                turns = table[index] = ghost_turns_at(self.level, center_x, center_y, direction, gate_open)
+            return turns
+        return ghost_turns_at(self.level, center_x, center_y, direction, gate_open)
+
+
+def board_key(level):
+    # Only walls and gates matter to movement; pellets (1, 2) read as floor
+    return bytes(min(tile, 3) if tile != 9 else 9 for row in level for tile in row) + bytes((len(level[0]),))
+
+
+def compile_walk_tables(level, cache_path=None):
+    # cache_path (see levels.Level.cache_path) keeps the filled tables on disk
+    key = board_key(level)
+    tables = _cache.get(key)
+    if tables is None:
+        walls = [[0 if tile < 3 else tile for tile in row] for row in level]
+        tables = WalkTables.from_bytes(walls, levels.read_artifact(cache_path))
+        if tables is None:
+            tables = WalkTables(walls)
+            if cache_path is not None:
+                levels.save_artifact(cache_path, tables.to_bytes())
+        _cache[key] = tables
+    return tables